@@ -0,0 +1,135 @@
+"""Пропускная способность отправки в Gateway: новый HTTP-клиент на запрос против общего пула
+
+Запуск из корня репозитория:
+    python benchmarks/gateway_client.py --requests 2000 --concurrency 50
+
+Заглушка Gateway работает в отдельном процессе и отвечает на POST /message фиксированным JSON,
+поэтому измеряются только затраты клиента (соединения, TLS отсутствует).
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from servers.telegram.config import (
+    GATEWAY_KEEPALIVE_EXPIRY, GATEWAY_MAX_CONNECTIONS, GATEWAY_MAX_KEEPALIVE_CONNECTIONS, GATEWAY_TIMEOUT
+)
+
+# Журнал httpx пишет строку на каждый запрос
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+STUB_RESPONSE = b'{"message_id":"1","client_type":"telegram","content":"ok","response_type":"text","metadata":{}}'
+
+PAYLOAD = {
+    "id": "1",
+    "client_type": "telegram",
+    "message_type": "text",
+    "content": "benchmark",
+    "user_id": "1",
+    "timestamp": "2026-01-01T00:00:00"
+}
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """HTTP/1.1 с keep-alive: чтение запроса и ответ-заглушка"""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                if name.lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(STUB_RESPONSE)}\r\n\r\n".encode()
+                + STUB_RESPONSE
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+def run_stub_gateway(sock: socket.socket):
+    async def serve():
+        server = await asyncio.start_server(handle_connection, sock=sock, backlog=1024)
+        await server.serve_forever()
+    
+    asyncio.run(serve())
+
+async def run_mode(mode: str, url: str, requests: int, concurrency: int) -> dict:
+    """Отправка requests запросов не более чем concurrency одновременно"""
+    limits = httpx.Limits(
+        max_connections=GATEWAY_MAX_CONNECTIONS,
+        max_keepalive_connections=GATEWAY_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=GATEWAY_KEEPALIVE_EXPIRY
+    )
+    pooled = httpx.AsyncClient(base_url=url, timeout=GATEWAY_TIMEOUT, limits=limits) if mode == "pooled" else None
+    latencies = []
+    remaining = iter(range(requests))
+    
+    async def send():
+        if pooled is not None:
+            response = await pooled.post("/message", json=PAYLOAD)
+        else:
+            # Поведение до пула: клиент и соединение создаются на каждое сообщение
+            async with httpx.AsyncClient(base_url=url, timeout=GATEWAY_TIMEOUT) as client:
+                response = await client.post("/message", json=PAYLOAD)
+        response.raise_for_status()
+    
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            await send()
+            latencies.append(time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        if pooled is not None:
+            await pooled.aclose()
+    elapsed = time.perf_counter() - started
+    
+    latencies.sort()
+    return {
+        "mode": mode,
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+    stub = multiprocessing.get_context("spawn").Process(target=run_stub_gateway, args=(sock,), daemon=True)
+    stub.start()
+    
+    try:
+        print(f"{'режим':<12}{'запр/с':>10}{'p50, мс':>10}{'p99, мс':>10}")
+        for mode in ("per-request", "pooled"):
+            result = asyncio.run(run_mode(mode, url, args.requests, args.concurrency))
+            print(f"{result['mode']:<12}{result['rps']:>10.0f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+    finally:
+        stub.terminate()
+        stub.join()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Микробенчмарки сериализации Gateway: стандартный json, orjson и MessagePack
+
+Запуск из корня репозитория:
+    python benchmarks/serialization.py --number 20000
+
+Полезная нагрузка - типичные UnifiedMessage и UnifiedResponse; для каждого способа
+выводится время одной операции в микросекундах (лучший из нескольких повторов).
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from core import serialization
+from core.models import ClientType, MessageType, UnifiedMessage, UnifiedResponse
+
+MESSAGE = UnifiedMessage(
+    id="0d6f1c4e-8a3b-4f43-9a55-2c1e7b6f9d10",
+    client_type=ClientType.TELEGRAM,
+    message_type=MessageType.TEXT,
+    content="Привет! Подскажи, пожалуйста, какая погода будет завтра в Москве и стоит ли брать зонт?",
+    user_id="123456789",
+    user_name="Иван",
+    timestamp=datetime(2026, 1, 1, 12, 0, 0),
+    metadata={"chat_id": 123456789, "message_id": 42, "tariff": "pro", "locale": "ru"}
+)
+
+RESPONSE = UnifiedResponse(
+    message_id=MESSAGE.id,
+    client_type=ClientType.TELEGRAM,
+    content="Завтра в Москве облачно, +5…+8 °C, после обеда возможен небольшой дождь - зонт лучше взять. " * 4,
+    response_type=MessageType.TEXT,
+    metadata={"cached": False, "tools": ["weather__forecast"], "duration_ms": 812.5}
+)
+
+def stdlib_dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def cases():
+    """(название, функция без аргументов)"""
+    message = MESSAGE.model_dump(mode="json")
+    response = {"status": "ok", "response": RESPONSE.model_dump(mode="json")}
+    message_json = stdlib_dumps(message)
+    response_json = stdlib_dumps(response)
+    
+    yield "json.dumps response", lambda: stdlib_dumps(response)
+    yield "json.loads message", lambda: json.loads(message_json)
+    if serialization.orjson is not None:
+        yield "orjson.dumps response", lambda: serialization.dumps(response)
+        yield "orjson.loads message", lambda: serialization.loads(message_json)
+    else:
+        print("orjson не установлен, dumps/loads используют стандартный json")
+    yield "pydantic model_dump_json", lambda: RESPONSE.model_dump_json()
+    yield "pydantic model_validate_json", lambda: UnifiedMessage.model_validate_json(message_json)
+    
+    if serialization.MSGPACK_AVAILABLE:
+        message_msgpack = serialization.packb(message)
+        yield "msgpack.packb response", lambda: serialization.packb(response)
+        yield "msgpack.unpackb message", lambda: serialization.unpackb(message_msgpack)
+        yield "msgpack unpackb + model_validate", lambda: UnifiedMessage.model_validate(
+            serialization.unpackb(message_msgpack)
+        )
+        print(f"Размер ответа: JSON {len(response_json)} байт, MessagePack {len(serialization.packb(response))} байт")
+    else:
+        print("msgpack не установлен, варианты MessagePack пропущены")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="операций в одном повторе")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    for name, func in cases():
+        best = min(timeit.repeat(func, number=args.number, repeat=args.repeat))
+        print(f"{name:<36}{best / args.number * 1e6:>10.2f} мкс")
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,33 @@
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
-import uuid
 import shlex
 
-from core.models import UnifiedMessage, UnifiedResponse, ClientType, MessageType, AdapterStatus, CommandRequest
+from core.models import UnifiedMessage, UnifiedResponse, ClientType, MessageType, AdapterStatus
 from core.message_processor import MessageProcessor
+from core.history import CommandHistory, HistoryEntry
+from core.history_store import HistoryStore
 
 logger = logging.getLogger(__name__)
 
+# Ограничения истории команд
+HISTORY_MAX_ENTRIES_PER_USER = 50
+HISTORY_MAX_USERS = 10000
+HISTORY_DISPLAY_SIZE = 10
+
+# Вид записей CLI истории в хранилище
+HISTORY_KIND = "cli_history"
+
 class CLIAdapter:
     """Адаптер для CLI интерфейса"""
     
-    def __init__(self, message_processor: MessageProcessor):
+    name = "cli"
+    client_type = ClientType.CLI
+    
+    def __init__(self, message_processor: MessageProcessor, history_store: Optional[HistoryStore] = None):
         self.message_processor = message_processor
+        # Общее для воркеров постоянное хранилище истории (None - только память процесса)
+        self.history_store = history_store
         self.status = AdapterStatus(is_healthy=False)
         self.available_commands = {
             "help": "Показать справку по командам",
@@ -23,7 +37,10 @@ class CLIAdapter:
             "history": "Показать историю команд",
             "clear": "Очистить историю"
         }
-        self.command_history = []
+        self.command_history = CommandHistory(
+            max_entries_per_user=HISTORY_MAX_ENTRIES_PER_USER,
+            max_users=HISTORY_MAX_USERS
+        )
         
     async def initialize(self):
         """Инициализация CLI адаптера"""
@@ -39,126 +56,90 @@ class CLIAdapter:
         self.command_history.clear()
         logger.info("CLI адаптер остановлен")
     
-    async def handle_command(self, command_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Обработка CLI команды"""
+    async def handle_unified_message(self, message: UnifiedMessage) -> UnifiedResponse:
+        """Обработка CLI команды из унифицированного сообщения (без повторной валидации)"""
         try:
             if not self.status.is_healthy:
-                return {"error": "CLI адаптер не готов к работе"}
+                return self._response(message, "CLI адаптер не готов к работе", success=False)
             
-            # Валидация входных данных
-            command_request = CommandRequest(**command_data)
+            command, args = self._parse_command(message)
             
             # Добавление в историю
-            self.command_history.append({
-                "command": command_request.command,
-                "args": command_request.args,
-                "timestamp": datetime.now(),
-                "user_id": command_request.user_id
-            })
+            self.command_history.append(message.user_id, command, args)
+            if self.history_store:
+                self.history_store.append(HISTORY_KIND, message.user_id, {"command": command, "args": args})
             
             # Обработка встроенных команд
-            if command_request.command in self.available_commands:
-                result = await self._handle_builtin_command(command_request)
-                return result
-            
-            # Создание унифицированного сообщения для обработки
-            content = f"{command_request.command} {' '.join(command_request.args)}".strip()
-            unified_message = UnifiedMessage(
-                id=str(uuid.uuid4()),
-                client_type=ClientType.CLI,
-                message_type=MessageType.COMMAND,
-                content=content,
-                user_id=command_request.user_id,
-                timestamp=datetime.now(),
-                metadata={
-                    "command": command_request.command,
-                    "args": command_request.args,
-                    "options": command_request.options
-                }
-            )
+            if command in self.available_commands:
+                return await self._handle_builtin_command(message, command, args)
             
-            # Обработка через центральный процессор
-            response = await self.message_processor.process_message(unified_message)
+            # Остальное передается центральному процессору как есть
+            response = await self.message_processor.process_message(message)
             
             # Обновление статистики
             self.status.last_activity = datetime.now()
             self.status.message_count += 1
             
-            return {
-                "success": True,
-                "output": response.content,
-                "command": command_request.command,
-                "timestamp": datetime.now().isoformat()
-            }
-            
+            return response
+        
         except Exception as e:
             logger.error(f"Ошибка обработки CLI команды: {e}")
             self.status.error_count += 1
-            return {
-                "success": False,
-                "error": str(e)
-            }
+            return self._response(message, str(e), success=False)
     
-    async def _handle_builtin_command(self, command_request: CommandRequest) -> Dict[str, Any]:
-        """Обработка встроенных CLI команд"""
-        cmd = command_request.command
+    def _parse_command(self, message: UnifiedMessage) -> Tuple[str, List[str]]:
+        """Команда и аргументы: из metadata клиента либо из текста сообщения"""
+        command = message.metadata.get("command")
+        if command is not None:
+            return command, list(message.metadata.get("args", []))
         
+        try:
+            parts = shlex.split(message.content)
+        except ValueError:
+            # Незакрытая кавычка (например, "send what's up") - разбор по пробелам
+            parts = message.content.split()
+        return (parts[0], parts[1:]) if parts else ("", [])
+    
+    def _response(self, message: UnifiedMessage, content: str, success: bool = True) -> UnifiedResponse:
+        """Ответ на CLI команду"""
+        return UnifiedResponse(
+            message_id=message.id,
+            client_type=message.client_type,
+            content=content,
+            response_type=MessageType.TEXT,
+            metadata={"success": success}
+        )
+    
+    async def _handle_builtin_command(self, message: UnifiedMessage, cmd: str, args: List[str]) -> UnifiedResponse:
+        """Обработка встроенных CLI команд"""
         if cmd == "help":
-            return {
-                "success": True,
-                "output": self._format_help()
-            }
+            return self._response(message, self._format_help())
         elif cmd == "status":
             stats = await self.message_processor.get_stats()
-            return {
-                "success": True,
-                "output": self._format_status(stats)
-            }
+            return self._response(message, self._format_status(stats))
         elif cmd == "stats":
             stats = await self.message_processor.get_stats()
-            return {
-                "success": True,
-                "output": self._format_stats(stats)
-            }
+            return self._response(message, self._format_stats(stats))
         elif cmd == "history":
-            return {
-                "success": True,
-                "output": self._format_history()
-            }
+            return self._response(message, self._format_history(await self._get_history(message.user_id)))
         elif cmd == "clear":
-            self.command_history.clear()
-            return {
-                "success": True,
-                "output": "История команд очищена"
-            }
+            self.command_history.clear(message.user_id)
+            if self.history_store:
+                self.history_store.clear_user(HISTORY_KIND, message.user_id)
+            return self._response(message, "История команд очищена")
         elif cmd == "send":
-            if not command_request.args:
-                return {
-                    "success": False,
-                    "error": "Использование: send <сообщение>"
-                }
-            
-            message_text = " ".join(command_request.args)
-            unified_message = UnifiedMessage(
-                id=str(uuid.uuid4()),
-                client_type=ClientType.CLI,
-                message_type=MessageType.TEXT,
-                content=message_text,
-                user_id=command_request.user_id,
-                timestamp=datetime.now(),
-                metadata={"via_cli": True}
-            )
+            if not args:
+                return self._response(message, "Использование: send <сообщение>", success=False)
             
-            response = await self.message_processor.process_message(unified_message)
-            return {
-                "success": True,
-                "output": response.content
-            }
+            # Копия без повторной валидации: меняются только тип и текст
+            text_message = message.model_copy(update={
+                "message_type": MessageType.TEXT,
+                "content": " ".join(args),
+                "metadata": {**message.metadata, "via_cli": True}
+            })
+            return await self.message_processor.process_message(text_message)
         
-        return {
-            "success": False,
-            "error": f"Неизвестная команда: {cmd}"
-        }
+        return self._response(message, f"Неизвестная команда: {cmd}", success=False)
     
     def _format_help(self) -> str:
         """Форматирование справки"""
@@ -187,31 +168,47 @@ class CLIAdapter:
     def _format_stats(self, stats: Dict[str, Any]) -> str:
         """Форматирование детальной статистики"""
         messages_by_client = stats.get("messages_by_client", {})
+        latency = stats.get("latency", {})
+        
+        def avg_latency_ms(client: str) -> float:
+            histogram = latency.get(client, {})
+            return histogram["sum"] / histogram["count"] * 1000 if histogram.get("count") else 0.0
+        
         return f"""
 Детальная статистика Gateway:
   Общее количество сообщений: {stats.get("total_messages", 0)}
   
   По типам клиентов:
-    Telegram: {messages_by_client.get("telegram", 0)}
-    Web: {messages_by_client.get("web", 0)}  
-    CLI: {messages_by_client.get("cli", 0)}
+    Telegram: {messages_by_client.get("telegram", 0)} (среднее время {avg_latency_ms("telegram"):.1f} мс)
+    Web: {messages_by_client.get("web", 0)} (среднее время {avg_latency_ms("web"):.1f} мс)
+    CLI: {messages_by_client.get("cli", 0)} (среднее время {avg_latency_ms("cli"):.1f} мс)
   
   Активных сессий: {stats.get("active_sessions", 0)}
   Ошибок: {stats.get("errors", 0)}
+  Воркеров: {stats.get("workers", 1)}
   Время работы: {stats.get("uptime_seconds", 0):.1f} секунд
         """.strip()
     
-    def _format_history(self) -> str:
-        """Форматирование истории команд"""
-        if not self.command_history:
+    async def _get_history(self, user_id: str) -> List[HistoryEntry]:
+        """Последние команды пользователя: из общего хранилища, если оно подключено"""
+        if not self.history_store:
+            return self.command_history.last(user_id, HISTORY_DISPLAY_SIZE)
+        
+        # Сброс буфера, чтобы в выборку попали только что выполненные команды
+        await self.history_store.flush()
+        records = await self.history_store.query_user(HISTORY_KIND, user_id, HISTORY_DISPLAY_SIZE)
+        return [HistoryEntry(data["command"], tuple(data["args"]), ts) for data, ts in records]
+    
+    def _format_history(self, entries: List[HistoryEntry]) -> str:
+        """Форматирование истории команд пользователя"""
+        if not entries:
             return "История команд пуста"
         
         history_text = "История команд:\\n\\n"
-        for i, entry in enumerate(self.command_history[-10:], 1):  # Последние 10 команд
-            timestamp = entry["timestamp"].strftime("%H:%M:%S")
-            cmd = entry["command"]
-            args = " ".join(entry["args"]) if entry["args"] else ""
-            history_text += f"  {i:2d}. [{timestamp}] {cmd} {args}\\n"
+        for i, entry in enumerate(entries, 1):
+            timestamp = datetime.fromtimestamp(entry.timestamp).strftime("%H:%M:%S")
+            args = " ".join(entry.args)
+            history_text += f"  {i:2d}. [{timestamp}] {entry.command} {args}\\n"
         
         return history_text
     
@@ -219,7 +216,7 @@ class CLIAdapter:
         """Получение справки по CLI"""
         return {
             "commands": self.available_commands,
-            "usage": "Отправьте POST запрос на /cli/execute с JSON: {\"command\": \"<команда>\", \"args\": [\"<аргументы>\"], \"user_id\": \"<id>\"}",
+            "usage": "Отправьте POST запрос на /message с client_type \"cli\" и текстом команды в content (либо metadata: {\"command\": \"<команда>\", \"args\": [\"<аргументы>\"]})",
             "examples": [
                 {"command": "help", "args": [], "description": "Показать справку"},
                 {"command": "send", "args": ["Привет", "мир"], "description": "Отправить сообщение"},
@@ -0,0 +1,58 @@
+import logging
+import asyncio
+from importlib.metadata import entry_points
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+from core.models import UnifiedMessage, UnifiedResponse, ClientType
+from core.message_processor import MessageProcessor
+
+logger = logging.getLogger(__name__)
+
+# Группа entry points для сторонних адаптеров: фабрика (message_processor) -> адаптер
+ADAPTERS_ENTRY_POINT_GROUP = "bot_farm.adapters"
+
+# Адаптер объявляет атрибуты name и client_type, методы initialize, shutdown,
+# health_check, handle_unified_message и (необязательно) stream_unified_message
+class AdapterRegistry:
+    """Реестр адаптеров клиентов, собираемый один раз при запуске"""
+    
+    def __init__(self):
+        self.adapters: Dict[ClientType, Any] = {}
+        # Готовые таблицы диспетчеризации: тип клиента -> обработчик
+        self.handlers: Dict[ClientType, Callable[[UnifiedMessage], Awaitable[UnifiedResponse]]] = {}
+        self.streamers: Dict[ClientType, Callable[[UnifiedMessage], AsyncIterator[str]]] = {}
+    
+    def register(self, adapter: Any):
+        """Регистрация адаптера по объявленному типу клиента"""
+        client_type = adapter.client_type
+        if client_type in self.adapters:
+            raise ValueError(f"Adapter for client type {client_type.value} is already registered")
+        
+        self.adapters[client_type] = adapter
+        self.handlers[client_type] = adapter.handle_unified_message
+        if hasattr(adapter, "stream_unified_message"):
+            self.streamers[client_type] = adapter.stream_unified_message
+        logger.info(f"Зарегистрирован адаптер {adapter.name} ({client_type.value})")
+    
+    def load_entry_points(self, message_processor: MessageProcessor):
+        """Загрузка сторонних адаптеров из entry points"""
+        for entry_point in entry_points(group=ADAPTERS_ENTRY_POINT_GROUP):
+            try:
+                factory = entry_point.load()
+                self.register(factory(message_processor))
+            except Exception as e:
+                logger.error(f"Ошибка загрузки адаптера {entry_point.name}: {e}")
+    
+    async def initialize_all(self):
+        """Инициализация всех адаптеров"""
+        await asyncio.gather(*(adapter.initialize() for adapter in self.adapters.values()))
+    
+    async def shutdown_all(self):
+        """Остановка всех адаптеров"""
+        await asyncio.gather(*(adapter.shutdown() for adapter in self.adapters.values()))
+    
+    async def health_checks(self) -> Dict[str, Any]:
+        """Состояние всех адаптеров: имя -> результат health_check"""
+        adapters = list(self.adapters.values())
+        results = await asyncio.gather(*(adapter.health_check() for adapter in adapters))
+        return {adapter.name: result for adapter, result in zip(adapters, results)}
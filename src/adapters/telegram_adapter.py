@@ -1,5 +1,5 @@
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator
 from datetime import datetime
 import uuid
 import httpx
@@ -12,6 +12,9 @@ logger = logging.getLogger(__name__)
 class TelegramAdapter:
     """Адаптер для Telegram Bot API"""
     
+    name = "telegram"
+    client_type = ClientType.TELEGRAM
+    
     def __init__(self, message_processor: MessageProcessor):
         self.message_processor = message_processor
         self.status = AdapterStatus(is_healthy=False)
@@ -61,6 +64,25 @@ class TelegramAdapter:
                 response_type=MessageType.TEXT
             )
     
+    async def stream_unified_message(self, message: UnifiedMessage) -> AsyncIterator[str]:
+        """Потоковая обработка унифицированного сообщения от Telegram-сервера"""
+        if not self.status.is_healthy:
+            logger.warning("Telegram адаптер не готов к работе")
+            yield "Telegram адаптер не готов к работе"
+            return
+        
+        try:
+            async for chunk in self.message_processor.stream_message(message):
+                yield chunk
+            
+            self.status.last_activity = datetime.now()
+            self.status.message_count += 1
+            
+        except Exception as e:
+            logger.error(f"Ошибка потоковой обработки сообщения от Telegram-сервера: {e}")
+            self.status.error_count += 1
+            yield f"Произошла ошибка при обработке сообщения: {str(e)}"
+    
     async def health_check(self) -> Dict[str, Any]:
         """Проверка здоровья адаптера"""
         return {
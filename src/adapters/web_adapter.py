@@ -1,24 +1,45 @@
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
-import uuid
 
-from core.models import UnifiedMessage, UnifiedResponse, ClientType, MessageType, AdapterStatus, WebMessage
+from core.models import UnifiedMessage, UnifiedResponse, ClientType, MessageType, AdapterStatus
 from core.message_processor import MessageProcessor
+from core.history_store import HistoryStore
+from core.session_store import SessionStore
 
 logger = logging.getLogger(__name__)
 
+# Вид записей веб-сессий в хранилище
+SESSION_KIND = "web_session"
+
+# Ограничения веб-сессий
+SESSION_IDLE_TTL = 30 * 60
+SESSION_MAX_SIZE = 10000
+
 class WebAdapter:
     """Адаптер для веб-интерфейса"""
     
-    def __init__(self, message_processor: MessageProcessor):
+    name = "web"
+    client_type = ClientType.WEB
+    
+    def __init__(self, message_processor: MessageProcessor, history_store: Optional[HistoryStore] = None):
         self.message_processor = message_processor
         self.status = AdapterStatus(is_healthy=False)
-        self.active_sessions = {}
+        self.active_sessions = SessionStore(idle_ttl=SESSION_IDLE_TTL, max_size=SESSION_MAX_SIZE)
+        # Постоянное хранилище сессий (None - только память процесса)
+        self.history_store = history_store
         
     async def initialize(self):
         """Инициализация веб-адаптера"""
         try:
+            if self.history_store:
+                # Восстановление сессий после перезапуска
+                # (сессии добавляются в порядке активности, чтобы сохранить порядок истечения)
+                sessions = await self.history_store.latest_by_key(SESSION_KIND)
+                for session_id, (user_id, _, ts) in sorted(sessions.items(), key=lambda item: item[1][2]):
+                    self.active_sessions.touch(session_id, user_id, timestamp=ts)
+                logger.info(f"Восстановлено веб-сессий: {len(self.active_sessions)}")
+            
             self.status.is_healthy = True
             logger.info("Web адаптер инициализирован")
         except Exception as e:
@@ -30,62 +51,47 @@ class WebAdapter:
         self.active_sessions.clear()
         logger.info("Web адаптер остановлен")
     
-    async def handle_message(self, message_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Обработка сообщения от веб-клиента"""
+    async def handle_unified_message(self, message: UnifiedMessage) -> UnifiedResponse:
+        """Обработка унифицированного сообщения от веб-клиента (без повторной валидации)"""
         try:
             if not self.status.is_healthy:
-                return {"error": "Web адаптер не готов к работе"}
-            
-            # Валидация входных данных
-            web_message = WebMessage(**message_data)
-            
-            # Создание унифицированного сообщения
-            unified_message = UnifiedMessage(
-                id=str(uuid.uuid4()),
-                client_type=ClientType.WEB,
-                message_type=web_message.message_type,
-                content=web_message.content,
-                user_id=web_message.user_id,
-                timestamp=datetime.now(),
-                metadata={
-                    "session_id": web_message.session_id,
-                    "user_agent": "web_client"  # Можно добавить из заголовков
-                }
-            )
+                return UnifiedResponse(
+                    message_id=message.id,
+                    client_type=message.client_type,
+                    content="Web адаптер не готов к работе",
+                    response_type=MessageType.TEXT,
+                    metadata={"success": False}
+                )
             
             # Обработка через центральный процессор
-            response = await self.message_processor.process_message(unified_message)
+            response = await self.message_processor.process_message(message)
             
             # Обновление статистики
             self.status.last_activity = datetime.now()
             self.status.message_count += 1
             
             # Обновление сессии
-            if web_message.session_id:
-                self.active_sessions[web_message.session_id] = {
-                    "user_id": web_message.user_id,
-                    "last_activity": datetime.now()
-                }
-            
-            return {
-                "success": True,
-                "response": {
-                    "content": response.content,
-                    "type": response.response_type,
-                    "timestamp": datetime.now().isoformat()
-                }
-            }
+            session_id = message.metadata.get("session_id")
+            if session_id:
+                self.active_sessions.touch(session_id, message.user_id)
+                if self.history_store:
+                    self.history_store.append(SESSION_KIND, message.user_id, {}, key=session_id)
             
+            return response
+        
         except Exception as e:
             logger.error(f"Ошибка обработки веб-сообщения: {e}")
             self.status.error_count += 1
-            return {
-                "success": False,
-                "error": str(e)
-            }
+            return UnifiedResponse(
+                message_id=message.id,
+                client_type=message.client_type,
+                content=f"Произошла ошибка при обработке сообщения: {str(e)}",
+                response_type=MessageType.TEXT,
+                metadata={"success": False}
+            )
     
-    async def get_status(self) -> Dict[str, Any]:
-        """Получение статуса веб-интерфейса"""
+    async def get_status(self, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """Получение статуса веб-интерфейса (сессии - постранично)"""
         return {
             "healthy": self.status.is_healthy,
             "active_sessions": len(self.active_sessions),
@@ -93,12 +99,14 @@ class WebAdapter:
             "message_count": self.status.message_count,
             "error_count": self.status.error_count,
             "sessions": {
-                session_id: {
-                    "user_id": session_data["user_id"],
-                    "last_activity": session_data["last_activity"].isoformat()
+                session["session_id"]: {
+                    "user_id": session["user_id"],
+                    "last_activity": datetime.fromtimestamp(session["last_activity"]).isoformat()
                 }
-                for session_id, session_data in self.active_sessions.items()
-            }
+                for session in self.active_sessions.page(offset, limit)
+            },
+            "offset": offset,
+            "limit": limit
         }
     
     async def health_check(self) -> Dict[str, Any]:
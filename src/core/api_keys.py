@@ -0,0 +1,122 @@
+import logging
+import hashlib
+import json
+import os
+import asyncio
+from typing import Dict, Optional
+
+from .models import APIKeyInfo, ClientType
+
+logger = logging.getLogger(__name__)
+
+# Ключи из переменных среды и тип клиента, к которому они привязаны
+ENV_API_KEYS = {
+    "TELEGRAM_API_KEY": ClientType.TELEGRAM,
+    "WEB_API_KEY": ClientType.WEB,
+    "CLI_API_KEY": ClientType.CLI
+}
+
+def hash_api_key(api_key: str) -> bytes:
+    """SHA-256 хеш API-ключа"""
+    return hashlib.sha256(api_key.encode()).digest()
+
+def _add_key(keys: Dict[bytes, APIKeyInfo], digest: bytes, key_info: APIKeyInfo):
+    """Добавление ключа; повторные привязки одного значения объединяются"""
+    existing = keys.get(digest)
+    if existing is None:
+        keys[digest] = key_info.model_copy(update={"key_id": digest.hex()})
+        return
+    
+    # Одно значение в нескольких переменных среды (или записях файла) допускает все их типы клиентов
+    logger.warning(f"API-ключи {existing.name} и {key_info.name} совпадают, привязки объединены")
+    if existing.client_type is None or key_info.client_type is None:
+        client_type, shared = None, []
+    else:
+        client_type = existing.client_type
+        shared = [
+            other for other in (*existing.shared_client_types, key_info.client_type, *key_info.shared_client_types)
+            if other != client_type
+        ]
+    quotas = [quota for quota in (existing.quota_per_minute, key_info.quota_per_minute) if quota]
+    keys[digest] = existing.model_copy(update={
+        "name": f"{existing.name},{key_info.name}",
+        "client_type": client_type,
+        "shared_client_types": list(dict.fromkeys(shared)),
+        "quota_per_minute": min(quotas) if quotas else None
+    })
+
+class APIKeyStore:
+    """Хранилище API-ключей в виде хешей с горячей перезагрузкой"""
+    
+    def __init__(self, keys_file: Optional[str] = None):
+        self.keys_file = keys_file
+        self.keys: Dict[bytes, APIKeyInfo] = {}
+        self.file_mtime: Optional[float] = None
+    
+    def load(self):
+        """Загрузка ключей из переменных среды и файла"""
+        keys: Dict[bytes, APIKeyInfo] = {}
+        
+        for env_name, client_type in ENV_API_KEYS.items():
+            if api_key := os.getenv(env_name):
+                _add_key(keys, hash_api_key(api_key), APIKeyInfo(name=env_name.lower(), client_type=client_type))
+        
+        mtime = None
+        if self.keys_file:
+            mtime = os.path.getmtime(self.keys_file)
+            for digest, key_info in self._load_file(self.keys_file).items():
+                _add_key(keys, digest, key_info)
+        
+        if not keys:
+            raise RuntimeError("No API keys configured in environment variables")
+        
+        # Атомарная замена: текущие запросы видят либо старый, либо новый набор
+        self.keys = keys
+        self.file_mtime = mtime
+        logger.info(f"Загружено API-ключей: {len(keys)}")
+    
+    def _load_file(self, path: str) -> Dict[bytes, APIKeyInfo]:
+        """Чтение ключей из JSON-файла: [{"key" | "key_sha256", "name", "client_type", "quota_per_minute"}]"""
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+        
+        keys = {}
+        for entry in entries:
+            if "key_sha256" in entry:
+                digest = bytes.fromhex(entry.pop("key_sha256"))
+            else:
+                digest = hash_api_key(entry.pop("key"))
+            _add_key(keys, digest, APIKeyInfo(**entry))
+        return keys
+    
+    def reload(self) -> bool:
+        """Перезагрузка ключей; при ошибке сохраняется текущий набор"""
+        try:
+            self.load()
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка перезагрузки API-ключей, используется прежний набор: {e}")
+            return False
+    
+    def lookup(self, api_key: str) -> Optional[APIKeyInfo]:
+        """Поиск ключа по SHA-256 хешу за O(1)"""
+        # Сравниваются хеши, а не сами ключи: время сравнения не зависит
+        # от того, сколько символов переданного ключа совпало с настоящим
+        return self.keys.get(hash_api_key(api_key))
+    
+    async def watch_file(self, interval: float):
+        """Фоновая перезагрузка ключей при изменении файла"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime = os.path.getmtime(self.keys_file)
+            except OSError as e:
+                logger.error(f"Файл API-ключей недоступен: {e}")
+                continue
+            
+            if mtime != self.file_mtime:
+                logger.info("Файл API-ключей изменен, перезагрузка")
+                self.reload()
+    
+    def __len__(self) -> int:
+        return len(self.keys)
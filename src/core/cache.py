@@ -0,0 +1,68 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+class TTLCache:
+    """LRU-кеш с необязательным временем жизни записей и ограничением по весу"""
+    
+    def __init__(self, max_size: int, max_weight: Optional[int] = None, weigh: Optional[Callable[[Any], int]] = None):
+        self.max_size = max_size
+        self.max_weight = max_weight
+        self.weigh = weigh
+        self.weight = 0
+        # ключ -> (значение, момент истечения или None для бессрочных записей, вес)
+        self.entries: "OrderedDict[Hashable, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0
+        }
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Значение из кеша или None, если записи нет или она устарела"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            value, expires_at, _ = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return value
+            self._remove(key)
+        
+        self.stats["misses"] += 1
+        return None
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Сохранение значения; ttl=None - без срока истечения"""
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        weight = self.weigh(value) if self.weigh else 0
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (value, expires_at, weight)
+        self.weight += weight
+        
+        while self.entries and (
+            len(self.entries) > self.max_size
+            or (self.max_weight is not None and self.weight > self.max_weight)
+        ):
+            _, (_, _, evicted_weight) = self.entries.popitem(last=False)
+            self.weight -= evicted_weight
+            self.stats["evictions"] += 1
+    
+    def _remove(self, key: Hashable):
+        """Удаление записи с учетом ее веса"""
+        _, _, weight = self.entries.pop(key)
+        self.weight -= weight
+    
+    def clear(self):
+        """Очистка кеша"""
+        self.entries.clear()
+        self.weight = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Счетчики кеша"""
+        return {
+            **self.stats,
+            "size": len(self.entries),
+            "weight": self.weight
+        }
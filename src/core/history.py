@@ -0,0 +1,53 @@
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, NamedTuple, Optional, Tuple
+
+class HistoryEntry(NamedTuple):
+    """Запись истории команд"""
+    command: str
+    args: Tuple[str, ...]
+    timestamp: float
+
+class CommandHistory:
+    """История команд: кольцевой буфер на пользователя с вытеснением простаивающих пользователей"""
+    
+    def __init__(self, max_entries_per_user: int, max_users: int):
+        self.max_entries_per_user = max_entries_per_user
+        self.max_users = max_users
+        # user_id -> кольцевой буфер; порядок - от давно неактивных к недавним
+        self.users: "OrderedDict[str, Deque[HistoryEntry]]" = OrderedDict()
+        self.size = 0
+    
+    def append(self, user_id: str, command: str, args: List[str]):
+        """Добавление команды в историю пользователя"""
+        entries = self.users.get(user_id)
+        if entries is None:
+            if len(self.users) >= self.max_users:
+                _, evicted = self.users.popitem(last=False)
+                self.size -= len(evicted)
+            entries = self.users[user_id] = deque(maxlen=self.max_entries_per_user)
+        else:
+            self.users.move_to_end(user_id)
+        
+        if len(entries) < self.max_entries_per_user:
+            self.size += 1
+        entries.append(HistoryEntry(command, tuple(args), time.time()))
+    
+    def last(self, user_id: str, count: int) -> List[HistoryEntry]:
+        """Последние count команд пользователя, от старых к новым"""
+        entries = self.users.get(user_id)
+        if not entries:
+            return []
+        count = min(count, len(entries))
+        return [entries[i] for i in range(len(entries) - count, len(entries))]
+    
+    def clear(self, user_id: Optional[str] = None):
+        """Очистка истории пользователя или всей истории"""
+        if user_id is None:
+            self.users.clear()
+            self.size = 0
+        elif (entries := self.users.pop(user_id, None)) is not None:
+            self.size -= len(entries)
+    
+    def __len__(self) -> int:
+        return self.size
@@ -0,0 +1,213 @@
+import logging
+import asyncio
+import json
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Маркер очистки истории пользователя (записи до него считаются удаленными)
+CLEAR_MARKER = "__clear__"
+
+class HistoryStore:
+    """Журнал истории и сессий в SQLite (WAL) с пакетной записью вне пути запроса"""
+    
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 0.5,
+        compact_interval: float = 600.0,
+        retention_per_user: int = 100,
+        max_pending: int = 100000
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.retention_per_user = retention_per_user
+        # Предел буфера при недоступной базе: сверх него отбрасываются самые старые записи
+        self.max_pending = max_pending
+        self.connection: Optional[sqlite3.Connection] = None
+        # Записи, ожидающие пакетной записи: (вид, user_id, ключ, данные, время)
+        self.pending: List[Tuple[str, str, str, str, float]] = []
+        # Все обращения к соединению выполняются в отдельном потоке по очереди
+        self.lock = asyncio.Lock()
+        self.flusher: Optional[asyncio.Task] = None
+        self.stats = {
+            "appended": 0,
+            "flushes": 0,
+            "compactions": 0,
+            "dropped": 0
+        }
+    
+    async def start(self):
+        """Открытие базы и запуск фоновой записи"""
+        self.connection = await asyncio.to_thread(self._open)
+        self.flusher = asyncio.create_task(self._run_flusher())
+        logger.info(f"Хранилище истории открыто: {self.path}")
+    
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # fsync выполняется на checkpoint, а не на каждую транзакцию
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                key TEXT NOT NULL DEFAULT '',
+                payload TEXT NOT NULL,
+                ts REAL NOT NULL
+            )
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS events_by_user ON events (kind, user_id, id)")
+        connection.execute("CREATE INDEX IF NOT EXISTS events_by_key ON events (kind, key, id)")
+        connection.commit()
+        return connection
+    
+    async def stop(self):
+        """Запись оставшихся данных и закрытие базы"""
+        if self.flusher:
+            self.flusher.cancel()
+            await asyncio.gather(self.flusher, return_exceptions=True)
+            self.flusher = None
+        await self.flush()
+        if self.connection:
+            await asyncio.to_thread(self.connection.close)
+            self.connection = None
+        logger.info("Хранилище истории закрыто")
+    
+    def append(self, kind: str, user_id: str, payload: Dict[str, Any], key: str = ""):
+        """Добавление записи в буфер (без ожидания записи на диск)"""
+        self.pending.append((kind, user_id, key, json.dumps(payload, ensure_ascii=False), time.time()))
+        self.stats["appended"] += 1
+    
+    def clear_user(self, kind: str, user_id: str):
+        """Логическая очистка истории пользователя маркером в журнале"""
+        self.append(kind, user_id, {}, key=CLEAR_MARKER)
+    
+    async def flush(self):
+        """Пакетная запись буфера одной транзакцией"""
+        if not self.pending or self.connection is None:
+            return
+        async with self.lock:
+            # Буфер забирается под блокировкой: запросы к базе выполняются до или после записи пакета
+            batch, self.pending = self.pending, []
+            if not batch:
+                return
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except sqlite3.Error:
+                # Пакет возвращается в буфер для повторной попытки, но не сверх max_pending
+                self.pending[:0] = batch
+                overflow = len(self.pending) - self.max_pending
+                if overflow > 0:
+                    del self.pending[:overflow]
+                    self.stats["dropped"] += overflow
+                    logger.error(f"Буфер хранилища истории переполнен, отброшено записей: {overflow}")
+                raise
+        self.stats["flushes"] += 1
+    
+    def _write_batch(self, batch: List[Tuple[str, str, str, str, float]]):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO events (kind, user_id, key, payload, ts) VALUES (?, ?, ?, ?, ?)",
+                batch
+            )
+    
+    async def query_user(self, kind: str, user_id: str, limit: int) -> List[Tuple[Dict[str, Any], float]]:
+        """Последние записи пользователя после последней очистки, от старых к новым"""
+        async with self.lock:
+            rows = await asyncio.to_thread(self._query_user, kind, user_id, limit)
+        return [(json.loads(payload), ts) for payload, ts in reversed(rows)]
+    
+    def _query_user(self, kind: str, user_id: str, limit: int) -> List[Tuple[str, float]]:
+        return self.connection.execute(
+            """
+            SELECT payload, ts FROM events
+            WHERE kind = ? AND user_id = ? AND key != ? AND id > COALESCE(
+                (SELECT MAX(id) FROM events WHERE kind = ? AND user_id = ? AND key = ?), 0
+            )
+            ORDER BY id DESC LIMIT ?
+            """,
+            (kind, user_id, CLEAR_MARKER, kind, user_id, CLEAR_MARKER, limit)
+        ).fetchall()
+    
+    async def latest_by_key(self, kind: str) -> Dict[str, Tuple[str, Dict[str, Any], float]]:
+        """Последнее состояние для каждого ключа: ключ -> (user_id, данные, время)"""
+        async with self.lock:
+            rows = await asyncio.to_thread(self._latest_by_key, kind)
+        return {key: (user_id, json.loads(payload), ts) for key, user_id, payload, ts in rows}
+    
+    def _latest_by_key(self, kind: str) -> List[Tuple[str, str, str, float]]:
+        return self.connection.execute(
+            """
+            SELECT key, user_id, payload, ts FROM events
+            WHERE id IN (SELECT MAX(id) FROM events WHERE kind = ? AND key != '' AND key != ? GROUP BY key)
+            """,
+            (kind, CLEAR_MARKER)
+        ).fetchall()
+    
+    async def compact(self):
+        """Удаление вытесненных записей и усечение WAL"""
+        async with self.lock:
+            removed = await asyncio.to_thread(self._compact)
+        self.stats["compactions"] += 1
+        logger.info(f"Сжатие хранилища истории: удалено записей {removed}")
+    
+    def _compact(self) -> int:
+        with self.connection:
+            # Записи до последней очистки пользователя
+            removed = self.connection.execute(
+                """
+                DELETE FROM events WHERE id < (
+                    SELECT MAX(c.id) FROM events c
+                    WHERE c.kind = events.kind AND c.user_id = events.user_id AND c.key = ?
+                )
+                """,
+                (CLEAR_MARKER,)
+            ).rowcount
+            # Устаревшие состояния ключей: остается только последнее
+            removed += self.connection.execute(
+                """
+                DELETE FROM events WHERE key NOT IN ('', ?) AND id NOT IN (
+                    SELECT MAX(id) FROM events WHERE key NOT IN ('', ?) GROUP BY kind, key
+                )
+                """,
+                (CLEAR_MARKER, CLEAR_MARKER)
+            ).rowcount
+            # Записи без ключа сверх лимита на пользователя
+            removed += self.connection.execute(
+                """
+                DELETE FROM events WHERE id IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (PARTITION BY kind, user_id ORDER BY id DESC) AS position
+                        FROM events WHERE key = ''
+                    ) WHERE position > ?
+                )
+                """,
+                (self.retention_per_user,)
+            ).rowcount
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+    
+    async def _run_flusher(self):
+        """Фоновая пакетная запись и периодическое сжатие"""
+        last_compaction = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - last_compaction >= self.compact_interval:
+                    await self.compact()
+                    last_compaction = time.monotonic()
+            except sqlite3.Error as e:
+                logger.error(f"Ошибка записи хранилища истории: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Счетчики хранилища"""
+        return {
+            **self.stats,
+            "pending": len(self.pending)
+        }
@@ -0,0 +1,478 @@
+import logging
+import asyncio
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import httpx
+
+from .models import MCPServerConfig
+from .serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Версия протокола MCP и сведения о клиенте для рукопожатия initialize
+MCP_PROTOCOL_VERSION = "2025-03-26"
+MCP_CLIENT_INFO = {"name": "bot-farm-gateway", "version": "1.0.0"}
+
+# Максимальная длина строки JSON-RPC от stdio-сервера
+STDIO_READ_LIMIT = 16 * 1024 * 1024
+
+# Переподключение к недоступному серверу: задержка растет после каждой неудачи
+RECONNECT_BACKOFF_MIN = 1.0
+RECONNECT_BACKOFF_MAX = 60.0
+
+# Обработчик уведомлений сервера: (имя сервера, метод, параметры)
+NotificationHandler = Callable[[str, str, Dict[str, Any]], None]
+
+class MCPError(Exception):
+    """Ошибка JSON-RPC, возвращенная MCP-сервером"""
+    
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(f"{message} (code {code})")
+        self.code = code
+        self.data = data
+
+class MCPConnectionError(Exception):
+    """Сессия с MCP-сервером закрыта или сервер недоступен"""
+
+class MCPSession(ABC):
+    """Сессия с MCP-сервером: JSON-RPC с мультиплексированием параллельных запросов"""
+    
+    def __init__(self, config: MCPServerConfig, on_notification: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.config = config
+        self.on_notification = on_notification
+        self.next_id = 0
+        # id запроса -> ожидающий ответа future
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.server_capabilities: Dict[str, Any] = {}
+        self.closed = False
+        # Фоновые отправки (отмена запросов, ответы серверу): ссылки держатся до завершения
+        self.background_tasks: Set[asyncio.Task] = set()
+    
+    @property
+    def in_flight(self) -> int:
+        """Количество запросов, ожидающих ответа"""
+        return len(self.pending)
+    
+    @property
+    def is_alive(self) -> bool:
+        return not self.closed
+    
+    async def start(self):
+        """Подключение и рукопожатие initialize"""
+        await self._connect()
+        result = await self.request("initialize", {
+            "protocolVersion": MCP_PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": MCP_CLIENT_INFO
+        })
+        self.server_capabilities = result.get("capabilities", {})
+        await self.notify("notifications/initialized")
+    
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Запрос JSON-RPC; ответы сопоставляются по id, поэтому запросы идут параллельно"""
+        if self.closed:
+            raise MCPConnectionError(f"Сессия с MCP-сервером {self.config.name} закрыта")
+        
+        self.next_id += 1
+        request_id = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        
+        async def send_and_wait():
+            await self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params or {}})
+            return await future
+        
+        try:
+            return await asyncio.wait_for(send_and_wait(), timeout or self.config.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Тайм-аут сессии или отмена вызывающим (например, по сроку всего запроса):
+            # сервер может прекратить обработку отмененного запроса
+            if not self.closed:
+                reason = "timeout" if isinstance(e, asyncio.TimeoutError) else "cancelled"
+                self._spawn(self._cancel_request(request_id, reason))
+            raise
+        finally:
+            self.pending.pop(request_id, None)
+    
+    async def notify(self, method: str, params: Optional[Dict[str, Any]] = None):
+        """Уведомление JSON-RPC (без ответа)"""
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        await self._send(message)
+    
+    def _spawn(self, coro):
+        """Запуск фоновой отправки с сохранением ссылки на задачу"""
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+    
+    async def _cancel_request(self, request_id: int, reason: str):
+        try:
+            await self.notify("notifications/cancelled", {"requestId": request_id, "reason": reason})
+        except Exception as e:
+            logger.debug(f"Не удалось отменить запрос {request_id} на MCP-сервере {self.config.name}: {e}")
+    
+    def _dispatch(self, message: Dict[str, Any]):
+        """Разбор входящего сообщения: ответ на запрос, запрос или уведомление сервера"""
+        if "method" not in message:
+            future = self.pending.get(message.get("id"))
+            if future is None or future.done():
+                return
+            if "error" in message:
+                error = message["error"]
+                future.set_exception(MCPError(error.get("code", 0), error.get("message", ""), error.get("data")))
+            else:
+                future.set_result(message.get("result") or {})
+        elif "id" in message:
+            self._spawn(self._answer_server_request(message))
+        elif self.on_notification:
+            self.on_notification(message["method"], message.get("params") or {})
+    
+    async def _answer_server_request(self, message: Dict[str, Any]):
+        """Ответ на запрос сервера: поддерживается только ping"""
+        if message["method"] == "ping":
+            reply = {"jsonrpc": "2.0", "id": message["id"], "result": {}}
+        else:
+            reply = {"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32601, "message": "Method not found"}}
+        try:
+            await self._send(reply)
+        except Exception as e:
+            logger.debug(f"Не удалось ответить MCP-серверу {self.config.name}: {e}")
+    
+    def _fail_pending(self, error: Exception):
+        """Закрытие сессии с ошибкой для всех ожидающих запросов"""
+        self.closed = True
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+    
+    @abstractmethod
+    async def _connect(self):
+        """Открытие транспорта"""
+    
+    @abstractmethod
+    async def _send(self, message: Dict[str, Any]):
+        """Отправка сообщения JSON-RPC"""
+    
+    @abstractmethod
+    async def close(self):
+        """Закрытие сессии и транспорта"""
+
+class StdioMCPSession(MCPSession):
+    """Сессия с MCP-сервером, запущенным как подпроцесс (JSON-RPC построчно через stdin/stdout)"""
+    
+    def __init__(self, config: MCPServerConfig, on_notification: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        super().__init__(config, on_notification)
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.reader: Optional[asyncio.Task] = None
+    
+    @property
+    def is_alive(self) -> bool:
+        return not self.closed and self.process is not None and self.process.returncode is None
+    
+    async def _connect(self):
+        self.process = await asyncio.create_subprocess_exec(
+            self.config.command,
+            *self.config.args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            env={**os.environ, **self.config.env},
+            limit=STDIO_READ_LIMIT
+        )
+        self.reader = asyncio.create_task(self._read_loop())
+    
+    async def _read_loop(self):
+        try:
+            while line := await self.process.stdout.readline():
+                try:
+                    message = loads(line)
+                except ValueError:
+                    logger.warning(f"MCP-сервер {self.config.name} прислал некорректную строку JSON-RPC")
+                    continue
+                self._dispatch(message)
+        except Exception as e:
+            logger.error(f"Ошибка чтения от MCP-сервера {self.config.name}: {e}")
+        finally:
+            self._fail_pending(MCPConnectionError(f"MCP-сервер {self.config.name} закрыл соединение"))
+    
+    async def _send(self, message: Dict[str, Any]):
+        if not self.is_alive:
+            raise MCPConnectionError(f"MCP-сервер {self.config.name} не запущен")
+        # Запись целой строки не перемежается с другими запросами
+        self.process.stdin.write(dumps(message) + b"\n")
+        try:
+            await self.process.stdin.drain()
+        except ConnectionError as e:
+            raise MCPConnectionError(f"MCP-сервер {self.config.name} закрыл stdin: {e}")
+    
+    async def close(self):
+        self.closed = True
+        if self.process is None:
+            return
+        if self.process.returncode is None:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), self.config.timeout)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        if self.reader:
+            await asyncio.gather(self.reader, return_exceptions=True)
+
+class HTTPMCPSession(MCPSession):
+    """Сессия с MCP-сервером по Streamable HTTP (ответы в JSON или потоком SSE)"""
+    
+    def __init__(self, config: MCPServerConfig, on_notification: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        super().__init__(config, on_notification)
+        self.client: Optional[httpx.AsyncClient] = None
+        self.session_id: Optional[str] = None
+    
+    async def _connect(self):
+        self.client = httpx.AsyncClient(timeout=self.config.timeout, headers=self.config.headers)
+    
+    async def _send(self, message: Dict[str, Any]):
+        headers = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
+        if self.session_id:
+            headers["Mcp-Session-Id"] = self.session_id
+        
+        try:
+            async with self.client.stream("POST", self.config.url, content=dumps(message), headers=headers) as response:
+                if response.status_code == 404 and self.session_id:
+                    self._fail_pending(MCPConnectionError(f"Сессия MCP-сервера {self.config.name} истекла"))
+                    raise MCPConnectionError(f"Сессия MCP-сервера {self.config.name} истекла")
+                response.raise_for_status()
+                
+                if session_id := response.headers.get("mcp-session-id"):
+                    self.session_id = session_id
+                
+                content_type = response.headers.get("content-type", "")
+                if content_type.startswith("text/event-stream"):
+                    async for data in self._iter_events(response):
+                        self._dispatch(loads(data))
+                elif content_type.startswith("application/json"):
+                    body = await response.aread()
+                    if body:
+                        payload = loads(body)
+                        for item in payload if isinstance(payload, list) else [payload]:
+                            self._dispatch(item)
+        except httpx.HTTPError as e:
+            raise MCPConnectionError(f"Ошибка HTTP при обращении к MCP-серверу {self.config.name}: {e}")
+    
+    async def _iter_events(self, response: httpx.Response):
+        """Данные событий Server-Sent Events"""
+        data: List[str] = []
+        async for line in response.aiter_lines():
+            if not line:
+                if data:
+                    yield "\n".join(data)
+                    data = []
+            elif line.startswith("data:"):
+                data.append(line[5:].lstrip())
+        if data:
+            yield "\n".join(data)
+    
+    async def close(self):
+        self.closed = True
+        if self.client is None:
+            return
+        if self.session_id:
+            try:
+                await self.client.delete(self.config.url, headers={"Mcp-Session-Id": self.session_id})
+            except httpx.HTTPError:
+                pass
+        await self.client.aclose()
+
+def create_session(config: MCPServerConfig, on_notification: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> MCPSession:
+    """Сессия по транспорту из описания сервера"""
+    if config.url:
+        return HTTPMCPSession(config, on_notification)
+    if config.command:
+        return StdioMCPSession(config, on_notification)
+    raise ValueError(f"MCP server {config.name} must define either command or url")
+
+class MCPServerPool:
+    """Пул постоянных сессий с одним MCP-сервером с проверкой и восстановлением"""
+    
+    def __init__(self, config: MCPServerConfig, on_notification: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.config = config
+        self.on_notification = on_notification
+        self.sessions: List[MCPSession] = []
+        # Открытие сессий выполняется по очереди
+        self.lock = asyncio.Lock()
+        self.backoff = RECONNECT_BACKOFF_MIN
+        self.retry_at = 0.0
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "sessions_opened": 0
+        }
+    
+    async def start(self):
+        """Открытие сессий пула"""
+        await self._replenish()
+    
+    async def _replenish(self):
+        """Дополнение пула до pool_size живыми сессиями с нарастающей задержкой при неудачах"""
+        async with self.lock:
+            # Завершившиеся сессии закрываются, чтобы освободить процессы и соединения
+            for session in self.sessions:
+                if not session.is_alive:
+                    await session.close()
+            self.sessions = [session for session in self.sessions if session.is_alive]
+            if len(self.sessions) >= self.config.pool_size or time.monotonic() < self.retry_at:
+                return
+            
+            while len(self.sessions) < self.config.pool_size:
+                session = create_session(self.config, self.on_notification)
+                try:
+                    await asyncio.wait_for(session.start(), self.config.timeout)
+                except Exception as e:
+                    await session.close()
+                    self.retry_at = time.monotonic() + self.backoff
+                    logger.error(f"Не удалось подключиться к MCP-серверу {self.config.name}, повтор через {self.backoff:.0f} с: {e}")
+                    self.backoff = min(self.backoff * 2, RECONNECT_BACKOFF_MAX)
+                    return
+                self.sessions.append(session)
+                self.stats["sessions_opened"] += 1
+            
+            self.backoff = RECONNECT_BACKOFF_MIN
+    
+    async def acquire(self) -> MCPSession:
+        """Наименее загруженная живая сессия"""
+        alive = [session for session in self.sessions if session.is_alive]
+        if len(alive) < self.config.pool_size:
+            await self._replenish()
+            alive = [session for session in self.sessions if session.is_alive]
+        if not alive:
+            raise MCPConnectionError(f"MCP-сервер {self.config.name} недоступен")
+        return min(alive, key=lambda session: session.in_flight)
+    
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Запрос через наименее загруженную сессию пула"""
+        session = await self.acquire()
+        self.stats["requests"] += 1
+        try:
+            return await session.request(method, params, timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+        except MCPConnectionError:
+            self.stats["errors"] += 1
+            raise
+    
+    async def health_check(self) -> Dict[str, Any]:
+        """Проверка сессий ping; неотвечающие сессии закрываются и переоткрываются"""
+        for session in list(self.sessions):
+            if not session.is_alive:
+                continue
+            try:
+                await session.request("ping", timeout=self.config.timeout)
+            except Exception as e:
+                logger.warning(f"MCP-сервер {self.config.name} не ответил на ping: {e}")
+                await session.close()
+        await self._replenish()
+        return {
+            "healthy": any(session.is_alive for session in self.sessions),
+            "sessions": sum(1 for session in self.sessions if session.is_alive),
+            "pool_size": self.config.pool_size
+        }
+    
+    async def close(self):
+        """Закрытие всех сессий пула"""
+        await asyncio.gather(*(session.close() for session in self.sessions), return_exceptions=True)
+        self.sessions = []
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Счетчики пула"""
+        return {
+            **self.stats,
+            "sessions": sum(1 for session in self.sessions if session.is_alive),
+            "in_flight": sum(session.in_flight for session in self.sessions)
+        }
+
+class MCPClient:
+    """MCP-клиент: постоянные пулы сессий ко всем настроенным MCP-серверам"""
+    
+    def __init__(self, servers: List[MCPServerConfig], health_check_interval: float = 30.0):
+        self.health_check_interval = health_check_interval
+        self.pools: Dict[str, MCPServerPool] = {
+            config.name: MCPServerPool(config, self._notification_callback(config.name))
+            for config in servers
+        }
+        self.notification_handlers: List[NotificationHandler] = []
+        self.health_checker: Optional[asyncio.Task] = None
+    
+    def _notification_callback(self, server: str) -> Callable[[str, Dict[str, Any]], None]:
+        def callback(method: str, params: Dict[str, Any]):
+            for handler in self.notification_handlers:
+                handler(server, method, params)
+        return callback
+    
+    def add_notification_handler(self, handler: NotificationHandler):
+        """Подписка на уведомления серверов (например, notifications/tools/list_changed)"""
+        self.notification_handlers.append(handler)
+    
+    async def start(self):
+        """Подключение ко всем серверам и запуск периодической проверки"""
+        await asyncio.gather(*(pool.start() for pool in self.pools.values()))
+        self.health_checker = asyncio.create_task(self._run_health_checks())
+        logger.info(f"MCP-клиент запущен, серверов: {len(self.pools)}")
+    
+    async def stop(self):
+        """Остановка проверки и закрытие всех сессий"""
+        if self.health_checker:
+            self.health_checker.cancel()
+            await asyncio.gather(self.health_checker, return_exceptions=True)
+            self.health_checker = None
+        await asyncio.gather(*(pool.close() for pool in self.pools.values()))
+        logger.info("MCP-клиент остановлен")
+    
+    async def request(self, server: str, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Запрос к серверу по имени (KeyError для неизвестного сервера)"""
+        return await self.pools[server].request(method, params, timeout)
+    
+    async def list_tools(self, server: str) -> List[Dict[str, Any]]:
+        """Полный список инструментов сервера (с учетом постраничной выдачи)"""
+        tools: List[Dict[str, Any]] = []
+        cursor = None
+        while True:
+            result = await self.request(server, "tools/list", {"cursor": cursor} if cursor else {})
+            tools.extend(result.get("tools", []))
+            cursor = result.get("nextCursor")
+            if not cursor:
+                return tools
+    
+    async def call_tool(self, server: str, name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Вызов инструмента сервера"""
+        return await self.request(server, "tools/call", {"name": name, "arguments": arguments}, timeout)
+    
+    async def _run_health_checks(self):
+        """Периодическая проверка и восстановление сессий"""
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.health_check()
+            except Exception as e:
+                logger.error(f"Ошибка проверки MCP-серверов: {e}")
+    
+    async def health_check(self) -> Dict[str, Any]:
+        """Состояние всех серверов: имя -> результат проверки"""
+        names = list(self.pools)
+        results = await asyncio.gather(*(self.pools[name].health_check() for name in names))
+        return dict(zip(names, results))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Счетчики по серверам"""
+        return {name: pool.get_stats() for name, pool in self.pools.items()}
+
+def load_mcp_servers(path: str) -> List[MCPServerConfig]:
+    """Чтение описаний серверов из JSON-файла: {"mcpServers": {"<имя>": {"command" | "url", ...}}}"""
+    with open(path, encoding="utf-8") as f:
+        servers = json.load(f)["mcpServers"]
+    return [MCPServerConfig(name=name, **entry) for name, entry in servers.items()]
@@ -1,32 +1,85 @@
 import logging
-from typing import Dict, Any
+import re
+from typing import Dict, Any, AsyncIterator, List, Optional
 from datetime import datetime
 import asyncio
+import time
 
 from .models import UnifiedMessage, UnifiedResponse, ClientType, MessageType
+from .cache import TTLCache
+from .response_cache import ResponseCache
+from .metrics import Metrics
+from .session_store import SessionStore
+from .state_backend import StateBackend
+from .mcp_client import MCPClient
+from .tool_catalog import ToolCatalog, ToolSet, EMPTY_TOOLSET
+from .tool_executor import ToolExecutor, ToolCall, ToolResult, error_result
+from .system_prompt import SystemPrompt, SystemPromptBuilder
 
 logger = logging.getLogger(__name__)
 
+# Время жизни закешированного ответа на /status; других записей в кеше команд нет
+STATUS_CACHE_TTL = 0.5
+COMMAND_CACHE_MAX_SIZE = 1
+
+# Справка не меняется и хранится вне кеша команд
+HELP_TEXT = """
+Доступные команды:
+/help - показать эту справку
+/start - приветствие
+/status - статус системы
+/stats - статистика Gateway
+
+Вы можете отправлять любые текстовые сообщения для обработки.
+""".strip()
+
+# Ограничения сессий по умолчанию
+SESSION_IDLE_TTL = 30 * 60
+SESSION_MAX_SIZE = 100000
+
+# Ключ множества активных сессий в общем хранилище состояния
+SESSIONS_KEY = "gateway:sessions"
+
 class MessageProcessor:
     """Центральный процессор сообщений"""
     
-    def __init__(self):
-        self.stats = {
-            "total_messages": 0,
-            "messages_by_client": {client.value: 0 for client in ClientType},
-            "errors": 0,
-            "start_time": datetime.now()
-        }
-        self.active_sessions = {}
+    def __init__(
+        self,
+        response_cache: Optional[ResponseCache] = None,
+        metrics: Optional[Metrics] = None,
+        sessions: Optional[SessionStore] = None,
+        state_backend: Optional[StateBackend] = None,
+        mcp_client: Optional[MCPClient] = None,
+        tool_catalog: Optional[ToolCatalog] = None,
+        tool_executor: Optional[ToolExecutor] = None,
+        system_prompts: Optional[SystemPromptBuilder] = None
+    ):
+        self.metrics = metrics or Metrics()
+        self.active_sessions = sessions if sessions is not None else SessionStore(idle_ttl=SESSION_IDLE_TTL, max_size=SESSION_MAX_SIZE)
+        # Общее для воркеров хранилище состояния (None - сессии учитываются только в процессе)
+        self.state_backend = state_backend
+        # Фоновые записи активности сессий в общее хранилище: ключ сессии -> задача
+        self.session_writes: Dict[str, asyncio.Task] = {}
+        # Кеш ответа на /status, общего для всех пользователей: ("/status",) -> текст
+        self.command_cache = TTLCache(max_size=COMMAND_CACHE_MAX_SIZE)
+        # Кеш ответов LLM (None - кеширование отключено)
+        self.response_cache = response_cache
+        # Пулы сессий с MCP-серверами (None - MCP-серверы не настроены)
+        self.mcp_client = mcp_client
+        # Готовые наборы инструментов по тарифам (None - инструменты не передаются LLM)
+        self.tool_catalog = tool_catalog
+        # Выполнение вызовов инструментов, запрошенных LLM
+        self.tool_executor = tool_executor
+        # Готовые system_prompt по (тариф, клиент, локаль)
+        self.system_prompts = system_prompts or SystemPromptBuilder()
         
     async def process_message(self, message: UnifiedMessage) -> UnifiedResponse:
         """Обработка унифицированного сообщения"""
+        started = time.perf_counter()
+        error = False
         try:
             logger.info(f"Обработка сообщения от {message.client_type}: {message.content[:50]}...")
-            
-            # Обновление статистики
-            self.stats["total_messages"] += 1
-            self.stats["messages_by_client"][message.client_type] += 1
+            self._touch_session(message)
             
             # Здесь будет логика обработки сообщения
             # В реальном проекте здесь будет интеграция с MCP-клиентом и LLM
@@ -43,7 +96,7 @@ class MessageProcessor:
             
         except Exception as e:
             logger.error(f"Ошибка обработки сообщения: {e}")
-            self.stats["errors"] += 1
+            error = True
             
             return UnifiedResponse(
                 message_id=message.id,
@@ -51,6 +104,68 @@ class MessageProcessor:
                 content=f"Произошла ошибка при обработке сообщения: {str(e)}",
                 response_type=MessageType.TEXT
             )
+        finally:
+            # Обновление статистики
+            duration = time.perf_counter() - started
+            self.metrics.record_message(message.client_type, duration, error=error)
+            self.metrics.record_stage("process_message", message.client_type, message.message_type, duration)
+    
+    async def stream_message(self, message: UnifiedMessage) -> AsyncIterator[str]:
+        """Потоковая обработка сообщения: ответ отдается частями по мере генерации"""
+        started = time.perf_counter()
+        error = False
+        try:
+            logger.info(f"Потоковая обработка сообщения от {message.client_type}: {message.content[:50]}...")
+            self._touch_session(message)
+            
+            async for chunk in self._generate_response_stream(message):
+                yield chunk
+                
+        except Exception as e:
+            logger.error(f"Ошибка потоковой обработки сообщения: {e}")
+            error = True
+            yield f"Произошла ошибка при обработке сообщения: {str(e)}"
+        finally:
+            # Обновление статистики
+            duration = time.perf_counter() - started
+            self.metrics.record_message(message.client_type, duration, error=error)
+            self.metrics.record_stage("process_message", message.client_type, message.message_type, duration)
+    
+    def _touch_session(self, message: UnifiedMessage):
+        """Обновление активности сессии: явная session_id либо пользователь клиента"""
+        session_id = message.metadata.get("session_id") or message.user_id
+        session_key = f"{message.client_type.value}:{session_id}"
+        self.active_sessions.touch(session_key, message.user_id)
+        # Запись в общее хранилище - вне пути запроса: медленное или недоступное хранилище
+        # не задерживает ответ, а для сессии выполняется не более одной записи одновременно
+        if self.state_backend and session_key not in self.session_writes:
+            task = asyncio.create_task(self._write_session(session_key))
+            self.session_writes[session_key] = task
+            task.add_done_callback(lambda _: self.session_writes.pop(session_key, None))
+    
+    async def _write_session(self, session_key: str):
+        """Продление активности сессии в общем хранилище (ошибки только журналируются)"""
+        try:
+            await self.state_backend.touch_member(SESSIONS_KEY, session_key, self.active_sessions.idle_ttl)
+        except Exception as e:
+            logger.warning(f"Не удалось обновить сессию {session_key} в общем хранилище: {e}")
+    
+    async def _count_sessions(self) -> int:
+        """Количество активных сессий: по общему хранилищу, при его недоступности - по процессу"""
+        if self.state_backend:
+            try:
+                return await self.state_backend.count_members(SESSIONS_KEY)
+            except Exception as e:
+                logger.warning(f"Не удалось получить число сессий из общего хранилища: {e}")
+        return len(self.active_sessions)
+    
+    async def _generate_response_stream(self, message: UnifiedMessage) -> AsyncIterator[str]:
+        """Генерация ответа частями"""
+        # Заглушка для демонстрации: готовый ответ режется на слова
+        # В реальном проекте здесь будут фрагменты потокового ответа LLM
+        content = await self._generate_response(message)
+        for chunk in re.findall(r"\S+\s*", content):
+            yield chunk
     
     async def _generate_response(self, message: UnifiedMessage) -> str:
         """Генерация ответа на сообщение"""
@@ -60,54 +175,116 @@ class MessageProcessor:
         if message.message_type == MessageType.COMMAND:
             return await self._handle_command(message)
         elif message.content.lower().startswith("/help"):
-            return self._get_help_text()
+            return HELP_TEXT
         elif message.content.lower().startswith("/status"):
-            return await self._get_status_text()
+            return await self._get_cached_status_text()
         else:
-            return f"Получено сообщение: {message.content}\\n\\nЭто демо-ответ от Gateway. В реальном проекте здесь будет ответ от LLM через MCP."
+            return await self._generate_llm_response(message)
+    
+    async def _generate_llm_response(self, message: UnifiedMessage) -> str:
+        """Ответ на сообщение: эхо запроса демо-заглушки и ответ LLM"""
+        # Эхо добавляется к каждому ответу отдельно и не попадает в кеш: ключ кеша
+        # нормализован, и запрос с другим написанием не должен получить чужой текст
+        reply = await self._get_llm_reply(message)
+        return f"Получено сообщение: {message.content}\\n\\n{reply}"
+    
+    async def _get_llm_reply(self, message: UnifiedMessage) -> str:
+        """Ответ LLM с использованием кеша ответов"""
+        # Пользователь может отказаться от кеша через metadata["no_cache"]
+        use_cache = self.response_cache is not None and not message.metadata.get("no_cache", False)
+        # Ответ зависит от доступных инструментов и system_prompt (клиент, локаль),
+        # поэтому ключи набора и промпта входят в ключ кеша
+        toolset = self._get_toolset(message)
+        prompt_key = self._get_prompt(message, toolset).key
+        
+        if use_cache:
+            cached = await self.response_cache.get(message.content, toolset.key, prompt_key)
+            if cached is not None:
+                return cached
+        
+        content = "Это демо-ответ от Gateway. В реальном проекте здесь будет ответ от LLM через MCP."
+        
+        if use_cache:
+            await self.response_cache.set(message.content, toolset.key, prompt_key, content)
+        
+        return content
+    
+    def _resolve_tariff(self, message: UnifiedMessage) -> Optional[str]:
+        """Тариф пользователя (metadata["tariff"]), известный каталогу, или None"""
+        if self.tool_catalog is None:
+            return None
+        return self.tool_catalog.resolve_tariff(message.metadata.get("tariff"))
+    
+    def _get_toolset(self, message: UnifiedMessage) -> ToolSet:
+        """Набор инструментов по тарифу пользователя; без известного тарифа - пустой набор"""
+        tariff = self._resolve_tariff(message)
+        return self.tool_catalog.get(tariff) if tariff else EMPTY_TOOLSET
+    
+    def get_system_prompt(self, message: UnifiedMessage) -> str:
+        """system_prompt для вызова LLM: готовая статическая часть и данные запроса"""
+        return self.system_prompts.render(self._get_prompt(message, self._get_toolset(message)), message)
+    
+    def _get_prompt(self, message: UnifiedMessage, toolset: ToolSet) -> SystemPrompt:
+        """Собранная статическая часть system_prompt для тарифа, клиента и локали сообщения"""
+        # Ключ и подпись промпта - по тарифу каталога, а не по произвольной строке из запроса
+        return self.system_prompts.get(
+            self._resolve_tariff(message),
+            message.client_type,
+            message.metadata.get("locale"),
+            toolset
+        )
+    
+    async def execute_tool_calls(self, message: UnifiedMessage, calls: List[ToolCall], deadline: Optional[float] = None) -> List[ToolResult]:
+        """Выполнение вызовов инструментов хода LLM: одновременно, в пределах набора тарифа и срока запроса"""
+        if self.tool_executor is None:
+            return [error_result(call, "Tools are not available") for call in calls]
+        return await self.tool_executor.execute(calls, self._get_toolset(message), deadline)
     
     async def _handle_command(self, message: UnifiedMessage) -> str:
         """Обработка команд"""
         command = message.content.strip()
         
         if command == "/start":
-            return f"Привет, {message.user_name or message.user_id}! Я Gateway бот, который объединяет CLI, Web и Telegram интерфейсы."
+            # Приветствие не кешируется: записи по каждому пользователю вытесняли бы общие записи кеша
+            user_name = message.user_name or message.user_id
+            return f"Привет, {user_name}! Я Gateway бот, который объединяет CLI, Web и Telegram интерфейсы."
         elif command == "/stats":
-            return await self._get_status_text()
+            return await self._get_cached_status_text()
         else:
             return f"Неизвестная команда: {command}"
     
-    def _get_help_text(self) -> str:
-        """Справочная информация"""
-        return """
-Доступные команды:
-/help - показать эту справку
-/start - приветствие
-/status - статус системы
-/stats - статистика Gateway
-
-Вы можете отправлять любые текстовые сообщения для обработки.
-        """.strip()
+    async def _get_cached_status_text(self) -> str:
+        """Информация о статусе из кеша с коротким временем жизни"""
+        status_text = self.command_cache.get(("/status",))
+        if status_text is None:
+            status_text = await self._get_status_text()
+            self.command_cache.set(("/status",), status_text, ttl=STATUS_CACHE_TTL)
+        return status_text
     
     async def _get_status_text(self) -> str:
         """Информация о статусе"""
-        uptime = datetime.now() - self.stats["start_time"]
+        stats = self.metrics.snapshot()
+        uptime = datetime.now() - stats["start_time"]
         return f"""
 Статус Gateway:
 • Время работы: {uptime}
-• Всего сообщений: {self.stats['total_messages']}
-• Ошибок: {self.stats['errors']}
+• Всего сообщений: {stats['total_messages']}
+• Ошибок: {stats['errors']}
 • Сообщений по типам:
-  - Telegram: {self.stats['messages_by_client']['telegram']}
-  - Web: {self.stats['messages_by_client']['web']}
-  - CLI: {self.stats['messages_by_client']['cli']}
+  - Telegram: {stats['messages_by_client']['telegram']}
+  - Web: {stats['messages_by_client']['web']}
+  - CLI: {stats['messages_by_client']['cli']}
         """.strip()
     
     async def get_stats(self) -> Dict[str, Any]:
         """Получение статистики"""
-        uptime = datetime.now() - self.stats["start_time"]
         return {
-            **self.stats,
-            "uptime_seconds": uptime.total_seconds(),
-            "active_sessions": len(self.active_sessions)
+            **self.metrics.snapshot(),
+            "active_sessions": await self._count_sessions(),
+            "command_cache": self.command_cache.get_stats(),
+            "response_cache": self.response_cache.get_stats() if self.response_cache else None,
+            "mcp_servers": self.mcp_client.get_stats() if self.mcp_client else None,
+            "tool_catalog": self.tool_catalog.get_stats() if self.tool_catalog else None,
+            "tool_calls": self.tool_executor.get_stats() if self.tool_executor else None,
+            "system_prompts": self.system_prompts.get_stats()
         }
\ No newline at end of file
@@ -0,0 +1,226 @@
+import logging
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import ClientType, MessageType
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы задержек, секунды (последняя корзина - +Inf)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Гистограмма задержек с фиксированными корзинами"""
+    
+    __slots__ = ("counts", "sum", "count")
+    
+    def __init__(self):
+        self.counts: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        """Учет одного измерения"""
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def merge(self, data: Dict[str, Any]):
+        """Добавление данных другой гистограммы (из снимка)"""
+        for i, bucket_count in enumerate(data["counts"]):
+            self.counts[i] += bucket_count
+        self.sum += data["sum"]
+        self.count += data["count"]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "buckets": list(LATENCY_BUCKETS),
+            "counts": list(self.counts),
+            "sum": self.sum,
+            "count": self.count
+        }
+
+# Каждый воркер периодически сбрасывает свой снимок в общий каталог (shared_dir)
+# и тем же фоновым циклом перечитывает снимки остальных воркеров, обновлявшихся недавно;
+# агрегированный снимок складывает собственные счетчики и последние прочитанные снимки без обращения к диску
+class Metrics:
+    """Счетчики и гистограммы задержек процесса с агрегацией между воркерами"""
+    
+    def __init__(self, shared_dir: Optional[str] = None, stale_after: float = 60.0):
+        self.shared_dir = shared_dir
+        self.stale_after = stale_after
+        self.start_time = time.time()
+        self.total_messages = 0
+        self.errors = 0
+        self.messages_by_client = {client.value: 0 for client in ClientType}
+        self.latency = {client.value: Histogram() for client in ClientType}
+        # Задержки этапов обработки: (этап, тип клиента, тип сообщения) -> гистограмма
+        self.stages: Dict[Tuple[str, str, str], Histogram] = {}
+        # Снимки остальных воркеров на момент последнего прохода фонового цикла
+        self.peer_snapshots: List[Dict[str, Any]] = []
+        
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+    
+    def record_message(self, client_type: ClientType, duration: float, error: bool = False):
+        """Учет обработанного сообщения"""
+        self.total_messages += 1
+        self.messages_by_client[client_type.value] += 1
+        self.latency[client_type.value].observe(duration)
+        if error:
+            self.errors += 1
+    
+    def record_stage(self, stage: str, client_type: ClientType, message_type: MessageType, duration: float):
+        """Учет длительности этапа обработки запроса"""
+        key = (stage, client_type.value, message_type.value)
+        histogram = self.stages.get(key)
+        if histogram is None:
+            histogram = self.stages[key] = Histogram()
+        histogram.observe(duration)
+    
+    def _raw_snapshot(self) -> Dict[str, Any]:
+        """Снимок счетчиков процесса в сериализуемом виде"""
+        return {
+            "pid": os.getpid(),
+            "start_time": self.start_time,
+            "total_messages": self.total_messages,
+            "errors": self.errors,
+            "messages_by_client": dict(self.messages_by_client),
+            "latency": {client: histogram.to_dict() for client, histogram in self.latency.items()},
+            "stages": {"|".join(key): histogram.to_dict() for key, histogram in self.stages.items()}
+        }
+    
+    def _worker_path(self) -> str:
+        return os.path.join(self.shared_dir, f"worker-{os.getpid()}.json")
+    
+    def flush(self):
+        """Атомарная запись снимка воркера в общий каталог"""
+        self._write_snapshot(self._raw_snapshot())
+    
+    def _write_snapshot(self, data: Dict[str, Any]):
+        path = self._worker_path()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    
+    def _worker_snapshots(self) -> List[Dict[str, Any]]:
+        """Снимки всех воркеров: собственный - из памяти, остальные - прочитанные фоновым циклом"""
+        return [self._raw_snapshot(), *self.peer_snapshots]
+    
+    def _read_peer_snapshots(self) -> List[Dict[str, Any]]:
+        """Чтение снимков остальных воркеров из общего каталога; устаревшие файлы пропускаются"""
+        snapshots = []
+        own_path = self._worker_path()
+        now = time.time()
+        for entry in os.scandir(self.shared_dir):
+            if not entry.name.endswith(".json") or entry.path == own_path:
+                continue
+            try:
+                if now - entry.stat().st_mtime > self.stale_after:
+                    continue
+                with open(entry.path, encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Не удалось прочитать метрики воркера {entry.name}: {e}")
+        return snapshots
+    
+    def snapshot(self, include_stages: bool = False) -> Dict[str, Any]:
+        """Агрегированный снимок метрик всех воркеров"""
+        snapshots = self._worker_snapshots()
+        messages_by_client = {client.value: 0 for client in ClientType}
+        latency = {client.value: Histogram() for client in ClientType}
+        stages: Dict[str, Histogram] = {}
+        
+        for data in snapshots:
+            for client, count in data["messages_by_client"].items():
+                messages_by_client[client] = messages_by_client.get(client, 0) + count
+            for client, histogram in data["latency"].items():
+                latency.setdefault(client, Histogram()).merge(histogram)
+            if include_stages:
+                for key, histogram in data.get("stages", {}).items():
+                    stages.setdefault(key, Histogram()).merge(histogram)
+        
+        start_time = min(data["start_time"] for data in snapshots)
+        result = {
+            "total_messages": sum(data["total_messages"] for data in snapshots),
+            "messages_by_client": messages_by_client,
+            "errors": sum(data["errors"] for data in snapshots),
+            "start_time": datetime.fromtimestamp(start_time),
+            "uptime_seconds": time.time() - start_time,
+            "workers": len(snapshots),
+            "latency": {client: histogram.to_dict() for client, histogram in latency.items()}
+        }
+        if include_stages:
+            result["stages"] = {key: histogram.to_dict() for key, histogram in stages.items()}
+        return result
+    
+    def render_prometheus(self) -> str:
+        """Агрегированные метрики в текстовом формате Prometheus"""
+        stats = self.snapshot(include_stages=True)
+        lines = [
+            "# HELP gateway_uptime_seconds Время работы Gateway",
+            "# TYPE gateway_uptime_seconds gauge",
+            f"gateway_uptime_seconds {stats['uptime_seconds']:.3f}",
+            "# HELP gateway_workers Количество воркеров в агрегированном снимке",
+            "# TYPE gateway_workers gauge",
+            f"gateway_workers {stats['workers']}",
+            "# HELP gateway_errors_total Ошибки обработки сообщений",
+            "# TYPE gateway_errors_total counter",
+            f"gateway_errors_total {stats['errors']}",
+            "# HELP gateway_messages_total Обработанные сообщения",
+            "# TYPE gateway_messages_total counter"
+        ]
+        for client, count in stats["messages_by_client"].items():
+            lines.append(f'gateway_messages_total{{client_type="{client}"}} {count}')
+        
+        lines.append("# HELP gateway_message_duration_seconds Время обработки сообщения")
+        lines.append("# TYPE gateway_message_duration_seconds histogram")
+        for client, histogram in stats["latency"].items():
+            lines.extend(_histogram_lines("gateway_message_duration_seconds", f'client_type="{client}"', histogram))
+        
+        lines.append("# HELP gateway_stage_duration_seconds Время этапов обработки запроса")
+        lines.append("# TYPE gateway_stage_duration_seconds histogram")
+        for key, histogram in sorted(stats["stages"].items()):
+            stage, client, message_type = key.split("|")
+            labels = f'stage="{stage}",client_type="{client}",message_type="{message_type}"'
+            lines.extend(_histogram_lines("gateway_stage_duration_seconds", labels, histogram))
+        
+        return "\n".join(lines) + "\n"
+    
+    async def run_flusher(self, interval: float):
+        """Фоновый периодический сброс снимка воркера и чтение снимков остальных воркеров"""
+        try:
+            while True:
+                # Снимок собирается в цикле событий, файловые операции - в отдельном потоке
+                try:
+                    await asyncio.to_thread(self._write_snapshot, self._raw_snapshot())
+                except OSError as e:
+                    logger.error(f"Ошибка записи метрик воркера: {e}")
+                try:
+                    self.peer_snapshots = await asyncio.to_thread(self._read_peer_snapshots)
+                except OSError as e:
+                    logger.error(f"Ошибка чтения метрик воркеров: {e}")
+                await asyncio.sleep(interval)
+        finally:
+            try:
+                os.remove(self._worker_path())
+            except OSError:
+                pass
+
+def _histogram_lines(name: str, labels: str, histogram: Dict[str, Any]) -> List[str]:
+    """Строки гистограммы в формате Prometheus (корзины накопительные)"""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram["buckets"], histogram["counts"]):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram["sum"]:.6f}')
+    lines.append(f'{name}_count{{{labels}}} {histogram["count"]}')
+    return lines
@@ -37,23 +37,33 @@ class UnifiedResponse(BaseModel):
     response_type: MessageType = MessageType.TEXT
     metadata: Dict[str, Any] = {}
     
-class CommandRequest(BaseModel):
-    """Модель CLI команды"""
-    command: str
-    args: List[str] = []
-    user_id: str
-    options: Dict[str, Any] = {}
-    
-class WebMessage(BaseModel):
-    """Модель веб-сообщения"""
-    content: str
-    user_id: str
-    session_id: Optional[str] = None
-    message_type: MessageType = MessageType.TEXT
-    
 class AdapterStatus(BaseModel):
     """Статус адаптера"""
     is_healthy: bool
     last_activity: Optional[datetime] = None
     error_count: int = 0
-    message_count: int = 0
\ No newline at end of file
+    message_count: int = 0
+    
+class APIKeyInfo(BaseModel):
+    """Описание API-ключа"""
+    name: str
+    client_type: Optional[ClientType] = None
+    # Другие типы клиентов, за которыми закреплено то же значение ключа
+    shared_client_types: List[ClientType] = []
+    quota_per_minute: Optional[int] = None
+    # Идентификатор ключа (hex SHA-256 хеша); задается хранилищем ключей, имена могут совпадать
+    key_id: str = ""
+    
+class MCPServerConfig(BaseModel):
+    """Описание MCP-сервера: stdio (command) или HTTP (url)"""
+    name: str
+    command: Optional[str] = None
+    args: List[str] = []
+    env: Dict[str, str] = {}
+    url: Optional[str] = None
+    headers: Dict[str, str] = {}
+    pool_size: int = 1
+    timeout: float = 30.0
+    max_concurrent_calls: int = 8
+    # Кешируемые инструменты: имя -> время жизни результата в секундах
+    cache_ttl: Dict[str, float] = {}
\ No newline at end of file
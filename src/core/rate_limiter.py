@@ -0,0 +1,60 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+class TokenBucketLimiter:
+    """Token bucket по ключам с LRU-вытеснением простаивающих ключей"""
+    
+    def __init__(self, rate: float, capacity: float, max_keys: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        # ключ -> [токены, время последнего пополнения]; порядок - от давно неактивных к недавним
+        self.buckets: "OrderedDict[Hashable, List[float]]" = OrderedDict()
+        self.stats = {
+            "allowed": 0,
+            "limited": 0,
+            "evicted": 0
+        }
+    
+    def acquire(self, key: Hashable, rate: Optional[float] = None, capacity: Optional[float] = None) -> float:
+        """Списывает токен; возвращает 0 при успехе или время ожидания в секундах"""
+        retry_after = self.check(key, rate, capacity)
+        if not retry_after:
+            self.consume(key)
+        return retry_after
+    
+    def check(self, key: Hashable, rate: Optional[float] = None, capacity: Optional[float] = None) -> float:
+        """Пополняет корзину без списания; возвращает 0, если токен есть, или время ожидания в секундах"""
+        rate = rate or self.rate
+        capacity = capacity or self.capacity
+        now = time.monotonic()
+        
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.max_keys:
+                self.buckets.popitem(last=False)
+                self.stats["evicted"] += 1
+            bucket = self.buckets[key] = [capacity, now]
+        else:
+            self.buckets.move_to_end(key)
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        
+        if bucket[0] >= 1:
+            return 0.0
+        
+        self.stats["limited"] += 1
+        return (1 - bucket[0]) / rate
+    
+    def consume(self, key: Hashable):
+        """Списывает токен после успешной проверки check (без await между ними)"""
+        self.buckets[key][0] -= 1
+        self.stats["allowed"] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Счетчики лимитера"""
+        return {
+            **self.stats,
+            "tracked_keys": len(self.buckets)
+        }
@@ -0,0 +1,49 @@
+import hashlib
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from .cache import TTLCache
+
+class ResponseCache(ABC):
+    """Базовый интерфейс кеша ответов LLM"""
+    
+    @abstractmethod
+    async def get(self, prompt: str, tools_key: str, prompt_key: str) -> Optional[str]:
+        """Ответ из кеша или None"""
+    
+    @abstractmethod
+    async def set(self, prompt: str, tools_key: str, prompt_key: str, content: str):
+        """Сохранение ответа"""
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Счетчики кеша"""
+        return {}
+
+def normalize_prompt(prompt: str) -> str:
+    """Нормализация запроса: регистр и пробельные символы не влияют на ключ"""
+    return re.sub(r"\s+", " ", prompt).strip().casefold()
+
+class ExactMatchResponseCache(ResponseCache):
+    """Кеш ответов по точному совпадению нормализованного запроса, набора инструментов и system_prompt"""
+    
+    def __init__(self, max_entries: int, max_bytes: int, ttl: Optional[float]):
+        self.ttl = ttl
+        self.cache = TTLCache(
+            max_size=max_entries,
+            max_weight=max_bytes,
+            weigh=lambda content: len(content.encode("utf-8"))
+        )
+    
+    def _key(self, prompt: str, tools_key: str, prompt_key: str) -> bytes:
+        """Ключ записи: хеш нормализованного запроса, ключа набора инструментов и хеша префикса system_prompt"""
+        return hashlib.sha256(f"{tools_key}\0{prompt_key}\0{normalize_prompt(prompt)}".encode("utf-8")).digest()
+    
+    async def get(self, prompt: str, tools_key: str, prompt_key: str) -> Optional[str]:
+        return self.cache.get(self._key(prompt, tools_key, prompt_key))
+    
+    async def set(self, prompt: str, tools_key: str, prompt_key: str, content: str):
+        self.cache.set(self._key(prompt, tools_key, prompt_key), content, ttl=self.ttl)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return self.cache.get_stats()
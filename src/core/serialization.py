@@ -0,0 +1,40 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Тип содержимого MessagePack для внутреннего обмена с клиентскими серверами
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+MSGPACK_AVAILABLE = msgpack is not None
+
+def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """Сериализация в JSON (UTF-8): orjson, если установлен, иначе стандартный json"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys).encode("utf-8")
+
+def loads(data: bytes | str) -> Any:
+    """Разбор JSON из байтов или строки"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def is_msgpack(content_type: str | None) -> bool:
+    """Относится ли тип содержимого (или заголовок Accept) к MessagePack"""
+    return bool(content_type) and MSGPACK_CONTENT_TYPE in content_type
+
+def packb(obj: Any) -> bytes:
+    """Сериализация в MessagePack"""
+    return msgpack.packb(obj, use_bin_type=True)
+
+def unpackb(data: bytes) -> Any:
+    """Разбор MessagePack (ValueError при некорректных данных)"""
+    return msgpack.unpackb(data, raw=False)
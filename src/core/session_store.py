@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Dict, List, Optional
+
+class SessionStore:
+    """Хранилище сессий с истечением по простою и LRU-вытеснением"""
+    
+    def __init__(self, idle_ttl: float, max_size: int):
+        self.idle_ttl = idle_ttl
+        self.max_size = max_size
+        # session_id -> данные сессии; порядок - по времени последней активности.
+        # Время простоя у всех сессий одинаковое, поэтому этот порядок совпадает
+        # с порядком истечения и устаревшие сессии всегда находятся в начале
+        self.sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats = {
+            "expired": 0,
+            "evicted": 0
+        }
+    
+    def touch(self, session_id: str, user_id: str, timestamp: Optional[float] = None, **data: Any):
+        """Создание или обновление сессии за O(1)"""
+        now = timestamp if timestamp is not None else time.time()
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = {"user_id": user_id, "created_at": now}
+        else:
+            self.sessions.move_to_end(session_id)
+        session["user_id"] = user_id
+        session["last_activity"] = now
+        session.update(data)
+        
+        self.expire()
+        while len(self.sessions) > self.max_size:
+            self.sessions.popitem(last=False)
+            self.stats["evicted"] += 1
+    
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Данные активной сессии или None"""
+        self.expire()
+        return self.sessions.get(session_id)
+    
+    def expire(self) -> int:
+        """Удаление сессий, простаивающих дольше idle_ttl"""
+        deadline = time.time() - self.idle_ttl
+        expired = 0
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session["last_activity"] > deadline:
+                break
+            del self.sessions[session_id]
+            expired += 1
+        self.stats["expired"] += expired
+        return expired
+    
+    def page(self, offset: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """Страница сессий, начиная с самых недавно активных"""
+        self.expire()
+        return [
+            {"session_id": session_id, **self.sessions[session_id]}
+            for session_id in islice(reversed(self.sessions), offset, offset + limit)
+        ]
+    
+    def clear(self):
+        """Удаление всех сессий"""
+        self.sessions.clear()
+    
+    def __len__(self) -> int:
+        self.expire()
+        return len(self.sessions)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Счетчики хранилища"""
+        return {
+            **self.stats,
+            "active": len(self)
+        }
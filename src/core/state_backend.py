@@ -0,0 +1,270 @@
+import logging
+import asyncio
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Восстановление соединений Redis после обрыва: задержка растет после каждой неудачи
+REDIS_RECONNECT_DELAY_MIN = 0.5
+REDIS_RECONNECT_DELAY_MAX = 30.0
+
+class StateBackend(ABC):
+    """Интерфейс общего для воркеров хранилища состояния"""
+    
+    async def start(self):
+        """Подключение к хранилищу"""
+    
+    async def stop(self):
+        """Отключение от хранилища"""
+    
+    @abstractmethod
+    async def touch_member(self, key: str, member: str, ttl: float):
+        """Продление жизни элемента множества с истечением"""
+    
+    @abstractmethod
+    async def count_members(self, key: str) -> int:
+        """Количество неистекших элементов множества"""
+
+class MemoryStateBackend(StateBackend):
+    """Хранилище состояния в памяти процесса (без разделения между воркерами)"""
+    
+    def __init__(self):
+        self.members: Dict[str, Dict[str, float]] = {}
+    
+    async def touch_member(self, key: str, member: str, ttl: float):
+        self.members.setdefault(key, {})[member] = time.time() + ttl
+    
+    async def count_members(self, key: str) -> int:
+        members = self.members.get(key, {})
+        now = time.time()
+        for member in [member for member, expires_at in members.items() if expires_at <= now]:
+            del members[member]
+        return len(members)
+
+class SQLiteStateBackend(StateBackend):
+    """Хранилище состояния в SQLite (WAL), общее для воркеров одной машины"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.connection: Optional[sqlite3.Connection] = None
+        self.lock = asyncio.Lock()
+    
+    async def start(self):
+        self.connection = await asyncio.to_thread(self._open)
+        logger.info(f"SQLite хранилище состояния открыто: {self.path}")
+    
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS members (
+                key TEXT NOT NULL, member TEXT NOT NULL, expires_at REAL NOT NULL,
+                PRIMARY KEY (key, member)
+            )
+        """)
+        connection.commit()
+        return connection
+    
+    async def stop(self):
+        if self.connection:
+            await asyncio.to_thread(self.connection.close)
+            self.connection = None
+    
+    async def _execute(self, func, *args) -> Any:
+        """Выполнение операции в отдельном потоке; операции сериализуются"""
+        async with self.lock:
+            return await asyncio.to_thread(func, *args)
+    
+    def _write(self, sql: str, params: Tuple[Any, ...]):
+        with self.connection:
+            self.connection.execute(sql, params)
+    
+    async def touch_member(self, key: str, member: str, ttl: float):
+        await self._execute(
+            self._write,
+            "INSERT OR REPLACE INTO members (key, member, expires_at) VALUES (?, ?, ?)",
+            (key, member, time.time() + ttl)
+        )
+    
+    async def count_members(self, key: str) -> int:
+        return await self._execute(self._count_members, key)
+    
+    def _count_members(self, key: str) -> int:
+        with self.connection:
+            self.connection.execute("DELETE FROM members WHERE key = ? AND expires_at <= ?", (key, time.time()))
+        return self.connection.execute("SELECT COUNT(*) FROM members WHERE key = ?", (key,)).fetchone()[0]
+
+class RedisProtocolError(Exception):
+    """Ошибка, возвращенная Redis-совместимым сервером"""
+
+class RedisStateBackend(StateBackend):
+    """Хранилище состояния на Redis-совместимом сервере (протокол RESP2, пул соединений)"""
+    
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        db: int = 0,
+        password: Optional[str] = None,
+        pool_size: int = 4,
+        acquire_timeout: float = 5.0
+    ):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.pool_size = pool_size
+        self.acquire_timeout = acquire_timeout
+        self.pool: asyncio.Queue = asyncio.Queue()
+        self.connections: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        # Фоновые задачи, открывающие замену сломанным соединениям
+        self.reconnects: Set[asyncio.Task] = set()
+    
+    async def start(self):
+        for _ in range(self.pool_size):
+            self.pool.put_nowait(await self._connect())
+        logger.info(f"Подключено к Redis-совместимому хранилищу {self.host}:{self.port}")
+    
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Открытие соединения с аутентификацией и выбором базы"""
+        connection = await asyncio.open_connection(self.host, self.port)
+        self.connections.append(connection)
+        try:
+            if self.password:
+                await self._call(connection, "AUTH", self.password)
+            if self.db:
+                await self._call(connection, "SELECT", self.db)
+        except BaseException:
+            self._discard(connection)
+            raise
+        return connection
+    
+    def _discard(self, connection: Tuple[asyncio.StreamReader, asyncio.StreamWriter]):
+        """Закрытие соединения без возврата в пул"""
+        if connection in self.connections:
+            self.connections.remove(connection)
+        connection[1].close()
+    
+    async def _reconnect(self):
+        """Открытие соединения взамен сломанного (с повторами, пока хранилище недоступно)"""
+        delay = REDIS_RECONNECT_DELAY_MIN
+        while True:
+            try:
+                self.pool.put_nowait(await self._connect())
+                return
+            except (OSError, RedisProtocolError) as e:
+                logger.error(f"Не удалось переподключиться к {self.host}:{self.port}, повтор через {delay:.1f} с: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, REDIS_RECONNECT_DELAY_MAX)
+    
+    async def stop(self):
+        for task in self.reconnects:
+            task.cancel()
+        await asyncio.gather(*self.reconnects, return_exceptions=True)
+        for _, writer in self.connections:
+            writer.close()
+        await asyncio.gather(*(writer.wait_closed() for _, writer in self.connections), return_exceptions=True)
+        self.connections.clear()
+        self.pool = asyncio.Queue()
+    
+    async def execute(self, *commands: Tuple[Any, ...]) -> List[Any]:
+        """Выполнение команд одним пакетом (pipeline) на соединении из пула"""
+        try:
+            connection = await asyncio.wait_for(self.pool.get(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(f"Нет свободных соединений с {self.host}:{self.port}")
+        
+        completed = False
+        try:
+            reader, writer = connection
+            writer.write(b"".join(_encode_command(command) for command in commands))
+            await writer.drain()
+            # Читаются все ответы пакета, даже если среди них есть ошибки,
+            # чтобы на соединении не осталось непрочитанных данных
+            replies = [await _read_reply(reader) for _ in commands]
+            completed = True
+        finally:
+            if completed:
+                self.pool.put_nowait(connection)
+            else:
+                # Обрыв, отмена или рассинхронизация: состояние соединения неизвестно,
+                # оно закрывается, а замена открывается в фоне
+                self._discard(connection)
+                task = asyncio.create_task(self._reconnect())
+                self.reconnects.add(task)
+                task.add_done_callback(self.reconnects.discard)
+        
+        for reply in replies:
+            if isinstance(reply, RedisProtocolError):
+                raise reply
+        return replies
+    
+    async def _call(self, connection: Tuple[asyncio.StreamReader, asyncio.StreamWriter], *args: Any) -> Any:
+        reader, writer = connection
+        writer.write(_encode_command(args))
+        await writer.drain()
+        reply = await _read_reply(reader)
+        if isinstance(reply, RedisProtocolError):
+            raise reply
+        return reply
+    
+    async def touch_member(self, key: str, member: str, ttl: float):
+        await self.execute(("ZADD", key, time.time() + ttl, member))
+    
+    async def count_members(self, key: str) -> int:
+        _, count = await self.execute(("ZREMRANGEBYSCORE", key, "-inf", time.time()), ("ZCARD", key))
+        return count
+
+def _encode_command(args: Tuple[Any, ...]) -> bytes:
+    """Кодирование команды в формат RESP"""
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+    return b"".join(parts)
+
+async def _read_reply(reader: asyncio.StreamReader) -> Any:
+    """Чтение одного ответа в формате RESP (ответ-ошибка возвращается как RedisProtocolError)"""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Соединение с Redis-совместимым сервером закрыто")
+    prefix, payload = line[:1], line[1:-2]
+    if prefix == b"+":
+        return payload.decode("utf-8")
+    if prefix == b"-":
+        return RedisProtocolError(payload.decode("utf-8"))
+    if prefix == b":":
+        return int(payload)
+    if prefix == b"$":
+        length = int(payload)
+        if length == -1:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if prefix == b"*":
+        length = int(payload)
+        if length == -1:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"Неизвестный тип ответа: {line!r}")
+
+def create_state_backend(url: str) -> StateBackend:
+    """Создание хранилища по URL: memory://, sqlite:///path.db, redis://[:password@]host:port/db"""
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        return MemoryStateBackend()
+    if parsed.scheme == "sqlite":
+        # sqlite:///relative.db или sqlite:////absolute/path.db
+        return SQLiteStateBackend(parsed.path[1:])
+    if parsed.scheme == "redis":
+        return RedisStateBackend(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip("/") or 0),
+            password=parsed.password
+        )
+    raise ValueError(f"Unsupported state backend: {url}")
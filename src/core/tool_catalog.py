@@ -0,0 +1,181 @@
+import logging
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .mcp_client import MCPClient
+from .serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Тариф по умолчанию: пользователи без тарифа и конфигурация без файла тарифов
+DEFAULT_TARIFF = "default"
+
+# Разделитель имени сервера и инструмента в имени для LLM (допустимые символы: [a-zA-Z0-9_-])
+TOOL_NAME_SEPARATOR = "__"
+
+# Задержка перед обновлением после уведомления: несколько уведомлений подряд дают одно обновление
+LIST_CHANGED_DEBOUNCE = 0.5
+
+class ToolSet(NamedTuple):
+    """Готовый набор инструментов тарифа"""
+    version: int
+    # Описания инструментов в формате LLM
+    tools: List[Dict[str, Any]]
+    # Сериализованный набор (JSON) для отправки без повторной сериализации
+    payload: bytes
+    # Ключ набора для кешей ответов: хеш payload
+    key: str
+    # Имя инструмента для LLM -> (сервер, имя инструмента на сервере)
+    routes: Dict[str, Tuple[str, str]]
+
+EMPTY_TOOLSET = ToolSet(version=0, tools=[], payload=b"[]", key="", routes={})
+
+class ToolCatalog:
+    """Кеш списков инструментов MCP-серверов с готовыми наборами по тарифам"""
+    
+    def __init__(self, mcp_client: MCPClient, tariffs: Optional[Dict[str, List[str]]] = None, ttl: float = 300.0):
+        self.mcp_client = mcp_client
+        # Тариф -> разрешенные серверы ("server") и инструменты ("server/tool"); "*" - все
+        self.tariffs = tariffs or {DEFAULT_TARIFF: ["*"]}
+        self.ttl = ttl
+        # Сервер -> инструменты из последнего успешного tools/list
+        self.server_tools: Dict[str, List[Dict[str, Any]]] = {}
+        self.version = 0
+        # Тариф -> готовый набор; заменяется целиком при каждом обновлении
+        self.toolsets: Dict[str, ToolSet] = {}
+        # Серверы, приславшие notifications/tools/list_changed
+        self.changed_servers: set = set()
+        self.refresh_scheduled: Optional[asyncio.Task] = None
+        self.refresher: Optional[asyncio.Task] = None
+        self.stats = {
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "list_changed": 0
+        }
+        mcp_client.add_notification_handler(self._handle_notification)
+    
+    async def start(self):
+        """Первичная загрузка каталога и запуск обновления по TTL"""
+        await self.refresh()
+        self.refresher = asyncio.create_task(self._run_refresher())
+    
+    async def stop(self):
+        """Остановка фонового обновления"""
+        for task in (self.refresher, self.refresh_scheduled):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self.refresher = None
+        self.refresh_scheduled = None
+    
+    def get(self, tariff: Optional[str]) -> ToolSet:
+        """Набор инструментов тарифа за O(1); для неизвестного тарифа - пустой набор"""
+        return self.toolsets.get(self.resolve_tariff(tariff), EMPTY_TOOLSET)
+    
+    def resolve_tariff(self, tariff: Any) -> Optional[str]:
+        """Тариф из данных запроса, приведенный к известному (без тарифа - по умолчанию), или None"""
+        tariff = tariff or DEFAULT_TARIFF
+        return tariff if isinstance(tariff, str) and tariff in self.tariffs else None
+    
+    async def refresh(self, servers: Optional[List[str]] = None):
+        """Запрос tools/list у серверов; при ошибке у сервера сохраняется прежний список"""
+        names = servers if servers is not None else list(self.mcp_client.pools)
+        results = await asyncio.gather(
+            *(self.mcp_client.list_tools(name) for name in names),
+            return_exceptions=True
+        )
+        
+        changed = False
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                self.stats["refresh_errors"] += 1
+                logger.error(f"Ошибка получения инструментов MCP-сервера {name}: {result}")
+                continue
+            if self.server_tools.get(name) != result:
+                self.server_tools[name] = result
+                changed = True
+        
+        self.stats["refreshes"] += 1
+        if changed or not self.toolsets:
+            self._rebuild()
+    
+    def _rebuild(self):
+        """Пересборка наборов всех тарифов (выполняется только при изменении списков)"""
+        self.version += 1
+        self.toolsets = {
+            tariff: self._build_toolset(allowed)
+            for tariff, allowed in self.tariffs.items()
+        }
+        logger.info(f"Каталог инструментов обновлен до версии {self.version}")
+    
+    def _build_toolset(self, allowed: List[str]) -> ToolSet:
+        """Отфильтрованный набор инструментов с сериализованными схемами"""
+        tools = []
+        routes = {}
+        for server in sorted(self.server_tools):
+            for tool in self.server_tools[server]:
+                if not self._is_allowed(allowed, server, tool["name"]):
+                    continue
+                name = f"{server}{TOOL_NAME_SEPARATOR}{tool['name']}"
+                tools.append({
+                    "name": name,
+                    "description": tool.get("description", ""),
+                    "input_schema": tool.get("inputSchema", {"type": "object"})
+                })
+                routes[name] = (server, tool["name"])
+        
+        payload = dumps(tools)
+        return ToolSet(
+            version=self.version,
+            tools=tools,
+            payload=payload,
+            key=hashlib.sha256(payload).hexdigest(),
+            routes=routes
+        )
+    
+    def _is_allowed(self, allowed: List[str], server: str, tool: str) -> bool:
+        """Разрешен ли инструмент тарифу"""
+        return "*" in allowed or server in allowed or f"{server}/{tool}" in allowed
+    
+    def _handle_notification(self, server: str, method: str, params: Dict[str, Any]):
+        """Обновление списка сервера по notifications/tools/list_changed"""
+        if method != "notifications/tools/list_changed":
+            return
+        self.stats["list_changed"] += 1
+        self.changed_servers.add(server)
+        if self.refresh_scheduled is None or self.refresh_scheduled.done():
+            self.refresh_scheduled = asyncio.create_task(self._refresh_changed())
+    
+    async def _refresh_changed(self):
+        # Уведомления, пришедшие во время обновления, обрабатываются следующим проходом
+        while self.changed_servers:
+            await asyncio.sleep(LIST_CHANGED_DEBOUNCE)
+            servers, self.changed_servers = list(self.changed_servers), set()
+            try:
+                await self.refresh(servers)
+            except Exception as e:
+                logger.error(f"Ошибка обновления каталога инструментов: {e}")
+    
+    async def _run_refresher(self):
+        """Периодическое обновление на случай серверов без уведомлений"""
+        while True:
+            await asyncio.sleep(self.ttl)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Ошибка обновления каталога инструментов: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Счетчики каталога"""
+        return {
+            **self.stats,
+            "version": self.version,
+            "tools": {tariff: len(toolset.tools) for tariff, toolset in self.toolsets.items()}
+        }
+
+def load_tariffs(path: str) -> Dict[str, List[str]]:
+    """Чтение тарифов из JSON-файла: {"<тариф>": ["<сервер>" | "<сервер>/<инструмент>" | "*"]}"""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
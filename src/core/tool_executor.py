@@ -0,0 +1,118 @@
+import logging
+import asyncio
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .mcp_client import MCPClient, MCPError, MCPConnectionError
+from .tool_catalog import ToolSet
+from .tool_result_cache import ToolResultCache
+
+logger = logging.getLogger(__name__)
+
+class ToolCall(NamedTuple):
+    """Вызов инструмента, запрошенный LLM"""
+    id: str
+    name: str
+    arguments: Dict[str, Any]
+
+class ToolResult(NamedTuple):
+    """Результат вызова инструмента для передачи LLM"""
+    call_id: str
+    content: List[Dict[str, Any]]
+    is_error: bool
+
+def error_result(call: ToolCall, text: str) -> ToolResult:
+    """Результат-ошибка: LLM получает ее текст вместо результата инструмента"""
+    return ToolResult(call.id, [{"type": "text", "text": text}], True)
+
+class ToolExecutor:
+    """Параллельное выполнение вызовов инструментов одного хода LLM"""
+    
+    def __init__(self, mcp_client: MCPClient, call_timeout: float = 30.0, result_cache: Optional[ToolResultCache] = None):
+        self.mcp_client = mcp_client
+        self.call_timeout = call_timeout
+        # Кеш результатов идемпотентных инструментов (None - кеширование отключено)
+        self.result_cache = result_cache
+        # Ограничение одновременных вызовов на сервер (max_concurrent_calls из описания сервера)
+        self.semaphores: Dict[str, asyncio.Semaphore] = {
+            name: asyncio.Semaphore(pool.config.max_concurrent_calls)
+            for name, pool in mcp_client.pools.items()
+        }
+        self.stats = {
+            "calls": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "deadline_exceeded": 0
+        }
+    
+    async def execute(self, calls: List[ToolCall], toolset: ToolSet, deadline: Optional[float] = None) -> List[ToolResult]:
+        """Выполнение независимых вызовов одновременно; результаты - в порядке вызовов"""
+        # deadline - момент по time.monotonic(), после которого незавершенные вызовы отменяются
+        return list(await asyncio.gather(*(self._execute_one(call, toolset, deadline) for call in calls)))
+    
+    async def _execute_one(self, call: ToolCall, toolset: ToolSet, deadline: Optional[float]) -> ToolResult:
+        """Один вызов с тайм-аутом, ограниченным сроком всего запроса"""
+        self.stats["calls"] += 1
+        
+        # Инструменты вне набора тарифа недоступны, даже если LLM их назвала
+        route = toolset.routes.get(call.name)
+        if route is None:
+            self.stats["errors"] += 1
+            return error_result(call, f"Unknown tool: {call.name}")
+        server, tool = route
+        
+        # Действует меньший из тайм-аутов исполнителя и сервера; он же передается сессии,
+        # чтобы в ошибке был указан сработавший тайм-аут
+        call_timeout = min(self.call_timeout, self.mcp_client.pools[server].config.timeout)
+        timeout = call_timeout
+        deadline_bound = False
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.stats["deadline_exceeded"] += 1
+                return error_result(call, "Request deadline exceeded")
+            if remaining < timeout:
+                timeout, deadline_bound = remaining, True
+        
+        started = time.perf_counter()
+        try:
+            # Ожидание свободного места в лимите сервера тоже ограничено тайм-аутом
+            result = await asyncio.wait_for(self._call(server, tool, call.arguments, timeout, call_timeout), timeout)
+        except asyncio.TimeoutError:
+            if deadline_bound:
+                self.stats["deadline_exceeded"] += 1
+                return error_result(call, "Request deadline exceeded")
+            self.stats["timeouts"] += 1
+            return error_result(call, f"Tool call timed out after {timeout:.1f} s")
+        except (MCPError, MCPConnectionError) as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Ошибка вызова инструмента {call.name}: {e}")
+            return error_result(call, str(e))
+        except Exception as e:
+            # Непредвиденная ошибка одного вызова не должна срывать весь ход
+            self.stats["errors"] += 1
+            logger.error(f"Непредвиденная ошибка вызова инструмента {call.name}: {e!r}")
+            return error_result(call, f"Tool call failed: {type(e).__name__}")
+        
+        logger.debug(f"Инструмент {call.name} выполнен за {time.perf_counter() - started:.3f} с")
+        return ToolResult(call.id, result.get("content", []), bool(result.get("isError", False)))
+    
+    async def _call(self, server: str, tool: str, arguments: Dict[str, Any], timeout: float, call_timeout: float) -> Dict[str, Any]:
+        if self.result_cache is None:
+            return await self._invoke(server, tool, arguments, timeout)
+        # Общий вызов кеша нужен и другим запросам, поэтому он не ограничивается сроком
+        # текущего запроса: ожидание этого запроса прерывает внешний тайм-аут
+        return await self.result_cache.get_or_call(
+            server, tool, arguments, lambda: self._invoke(server, tool, arguments, call_timeout)
+        )
+    
+    async def _invoke(self, server: str, tool: str, arguments: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        async with self.semaphores[server]:
+            return await self.mcp_client.call_tool(server, tool, arguments, timeout)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Счетчики вызовов и кеша результатов"""
+        return {
+            **self.stats,
+            "result_cache": self.result_cache.get_stats() if self.result_cache else None
+        }
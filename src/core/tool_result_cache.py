@@ -0,0 +1,86 @@
+import asyncio
+import copy
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from .cache import TTLCache
+from .models import MCPServerConfig
+from .serialization import dumps, loads
+
+def tool_cache_ttls(servers: List[MCPServerConfig]) -> Dict[Tuple[str, str], float]:
+    """Время жизни результатов по (сервер, инструмент) из описаний серверов"""
+    return {
+        (config.name, tool): ttl
+        for config in servers
+        for tool, ttl in config.cache_ttl.items()
+    }
+
+class ToolResultCache:
+    """Кеш результатов идемпотентных инструментов MCP с объединением одинаковых вызовов"""
+    
+    def __init__(self, ttls: Dict[Tuple[str, str], float], max_entries: int, max_bytes: int):
+        # Кешируются только инструменты, для которых объявлено время жизни
+        self.ttls = ttls
+        # Значение - сериализованный результат: каждое попадание получает свою копию
+        self.cache = TTLCache(max_size=max_entries, max_weight=max_bytes, weigh=len)
+        # Выполняющиеся вызовы: одинаковые одновременные вызовы ждут один результат
+        self.inflight: Dict[bytes, asyncio.Task] = {}
+        self.stats = {
+            "uncacheable": 0,
+            "coalesced": 0
+        }
+    
+    def _key(self, server: str, tool: str, arguments: Dict[str, Any]) -> bytes:
+        """Ключ записи: хеш сервера, инструмента и аргументов с упорядоченными ключами"""
+        return hashlib.sha256(
+            server.encode("utf-8") + b"\0" + tool.encode("utf-8") + b"\0" + dumps(arguments, sort_keys=True)
+        ).digest()
+    
+    async def get_or_call(
+        self,
+        server: str,
+        tool: str,
+        arguments: Dict[str, Any],
+        call: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Результат из кеша, иначе вызов инструмента с сохранением результата"""
+        ttl = self.ttls.get((server, tool))
+        if ttl is None:
+            self.stats["uncacheable"] += 1
+            return await call()
+        
+        key = self._key(server, tool, arguments)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return loads(cached)
+        
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(call())
+            self.inflight[key] = task
+            task.add_done_callback(lambda done: self._store(key, ttl, done))
+            # Отмена одного ожидающего (например, по сроку запроса) не прерывает вызов для остальных
+            return await asyncio.shield(task)
+        
+        self.stats["coalesced"] += 1
+        return copy.deepcopy(await asyncio.shield(task))
+    
+    def _store(self, key: bytes, ttl: float, task: asyncio.Task):
+        """Сохранение успешного результата завершившегося вызова"""
+        del self.inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        result = task.result()
+        # Ошибки инструмента не кешируются
+        if not result.get("isError", False):
+            self.cache.set(key, dumps(result), ttl=ttl)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Счетчики кеша и доля попаданий"""
+        stats = self.cache.get_stats()
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            **self.stats,
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0
+        }
@@ -1,18 +1,38 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException, status, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from pydantic import BaseModel, ValidationError
 from typing import Dict, Any, Optional
 import logging
 import asyncio
+import math
+import signal
+import time
 from datetime import datetime
 import os
 
 from adapters.telegram_adapter import TelegramAdapter
 from adapters.web_adapter import WebAdapter
 from adapters.cli_adapter import CLIAdapter
+from adapters.registry import AdapterRegistry
 from core.message_processor import MessageProcessor
-from core.models import UnifiedMessage, ClientType
+from core.models import UnifiedMessage, ClientType, APIKeyInfo
+from core.api_keys import APIKeyStore
+from core.rate_limiter import TokenBucketLimiter
+from core.response_cache import ExactMatchResponseCache
+from core.metrics import Metrics
+from core.history_store import HistoryStore
+from core.session_store import SessionStore
+from core.state_backend import create_state_backend
+from core.mcp_client import MCPClient, load_mcp_servers
+from core.tool_catalog import ToolCatalog, load_tariffs
+from core.tool_executor import ToolExecutor
+from core.tool_result_cache import ToolResultCache, tool_cache_ttls
+from core.system_prompt import SystemPromptBuilder, DEFAULT_LOCALE
+from core.serialization import MSGPACK_AVAILABLE, MSGPACK_CONTENT_TYPE, dumps, loads, is_msgpack, unpackb
+from responses import FastJSONResponse, MsgPackResponse
 
 from dotenv import load_dotenv
 
@@ -29,71 +49,230 @@ from fastapi.security import APIKeyHeader
 # Настройка заголовка API ключей
 API_KEY_HEADER = APIKeyHeader(name="X-API-Key")
 
-# Получение API ключей из переменных среды
-def get_api_keys():
-    """Возвращает список валидных API-ключей"""
-    keys = []
-    
-    # Ключ для Telegram
-    if telegram_key := os.getenv("TELEGRAM_API_KEY"):
-        keys.append(telegram_key)
-    
-    # Другие ключи (пример для веб и CLI)
-    if web_key := os.getenv("WEB_API_KEY"):
-        keys.append(web_key)
-    
-    if cli_key := os.getenv("CLI_API_KEY"):
-        keys.append(cli_key)
-    
-    if not keys:
-        raise RuntimeError("No API keys configured in environment variables")
-    
-    return keys
+# Хранилище API ключей: переменные среды + необязательный JSON-файл (API_KEYS_FILE)
+API_KEYS_FILE = os.getenv("API_KEYS_FILE")
+API_KEYS_RELOAD_INTERVAL = float(os.getenv("API_KEYS_RELOAD_INTERVAL", "5.0"))
 
 # Инициализация API ключей при старте приложения
-VALID_API_KEYS = get_api_keys()
+api_key_store = APIKeyStore(API_KEYS_FILE)
+api_key_store.load()
 
 # Функция для проверки аутентификации
-async def api_key_auth(api_key: str = Depends(API_KEY_HEADER)):
+async def api_key_auth(request: Request, api_key: str = Depends(API_KEY_HEADER)) -> APIKeyInfo:
+    started = time.perf_counter()
     if not api_key:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Missing API Key"
         )
     
-    if api_key not in VALID_API_KEYS:
+    key_info = api_key_store.lookup(api_key)
+    if key_info is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid API Key"
         )
     
-    return api_key
+    # Длительность проверки учитывается в метриках, когда известен тип сообщения
+    request.state.auth_duration = time.perf_counter() - started
+    return key_info
+
+def is_client_allowed(key_info: APIKeyInfo, message: UnifiedMessage) -> bool:
+    """Проверка, что ключ разрешает отправку от имени типа клиента сообщения"""
+    return (
+        key_info.client_type is None
+        or key_info.client_type == message.client_type
+        or message.client_type in key_info.shared_client_types
+    )
+
+# Ограничение частоты запросов (token bucket): по API ключу и по пользователю
+# (в памяти воркера: при запуске через launcher.py лимиты действуют на каждый воркер отдельно)
+RATE_LIMIT_KEY_PER_MINUTE = float(os.getenv("RATE_LIMIT_KEY_PER_MINUTE", "6000"))
+RATE_LIMIT_USER_PER_MINUTE = float(os.getenv("RATE_LIMIT_USER_PER_MINUTE", "30"))
+RATE_LIMIT_USER_BURST = float(os.getenv("RATE_LIMIT_USER_BURST", "5"))
+RATE_LIMIT_MAX_BUCKETS = int(os.getenv("RATE_LIMIT_MAX_BUCKETS", "10000"))
+
+key_rate_limiter = TokenBucketLimiter(
+    rate=RATE_LIMIT_KEY_PER_MINUTE / 60,
+    capacity=RATE_LIMIT_KEY_PER_MINUTE,
+    max_keys=RATE_LIMIT_MAX_BUCKETS
+)
+user_rate_limiter = TokenBucketLimiter(
+    rate=RATE_LIMIT_USER_PER_MINUTE / 60,
+    capacity=RATE_LIMIT_USER_BURST,
+    max_keys=RATE_LIMIT_MAX_BUCKETS
+)
+
+def check_rate_limit(key_info: APIKeyInfo, message: UnifiedMessage) -> float:
+    """Списывает токены ключа и пользователя; возвращает 0 или время ожидания в секундах"""
+    # Токены списываются только если запрос проходят оба лимита: отклоненный
+    # лимитом пользователя запрос не расходует квоту ключа
+    key = key_info.key_id
+    user = (message.client_type, message.user_id)
+    if key_info.quota_per_minute:
+        key_wait = key_rate_limiter.check(key, rate=key_info.quota_per_minute / 60, capacity=key_info.quota_per_minute)
+    else:
+        key_wait = key_rate_limiter.check(key)
+    user_wait = user_rate_limiter.check(user)
+    
+    if key_wait or user_wait:
+        return max(key_wait, user_wait)
+    
+    key_rate_limiter.consume(key)
+    user_rate_limiter.consume(user)
+    return 0.0
+
+def enforce_rate_limit(key_info: APIKeyInfo, message: UnifiedMessage):
+    """Отклоняет запрос с 429 и Retry-After при превышении лимита"""
+    if retry_after := check_rate_limit(key_info, message):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+# Настройки пакетной обработки
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "10"))
+
+# Настройки кеша ответов LLM
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+
+# Метрики: при заданном METRICS_DIR воркеры обмениваются снимками через общий каталог
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1.0"))
+METRICS_STALE_AFTER = float(os.getenv("METRICS_STALE_AFTER", "60.0"))
+
+# Постоянное хранилище истории CLI и веб-сессий (SQLite), отключено без HISTORY_DB_PATH
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH")
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "0.5"))
+HISTORY_COMPACT_INTERVAL = float(os.getenv("HISTORY_COMPACT_INTERVAL", "600"))
+HISTORY_RETENTION_PER_USER = int(os.getenv("HISTORY_RETENTION_PER_USER", "100"))
+HISTORY_MAX_PENDING = int(os.getenv("HISTORY_MAX_PENDING", "100000"))
+
+# Сессии пользователей в процессоре сообщений
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+SESSION_MAX_SIZE = int(os.getenv("SESSION_MAX_SIZE", "100000"))
+
+# Общее хранилище состояния воркеров: memory://, sqlite:///state.db, redis://host:6379/0
+STATE_BACKEND_URL = os.getenv("STATE_BACKEND_URL")
+
+# MCP-серверы: описания из JSON-файла (MCP_SERVERS_FILE), без него MCP-клиент отключен
+MCP_SERVERS_FILE = os.getenv("MCP_SERVERS_FILE")
+MCP_HEALTH_CHECK_INTERVAL = float(os.getenv("MCP_HEALTH_CHECK_INTERVAL", "30"))
+
+# Каталог инструментов: тарифы из JSON-файла (без него все инструменты доступны тарифу default)
+TOOL_TARIFFS_FILE = os.getenv("TOOL_TARIFFS_FILE")
+TOOL_CATALOG_TTL = float(os.getenv("TOOL_CATALOG_TTL", "300"))
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "30"))
+
+# Кеш результатов инструментов (кешируются инструменты с cache_ttl в описании сервера)
+TOOL_RESULT_CACHE_ENABLED = os.getenv("TOOL_RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TOOL_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_RESULT_CACHE_MAX_ENTRIES", "10000"))
+TOOL_RESULT_CACHE_MAX_BYTES = int(os.getenv("TOOL_RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Разделы system_prompt: встроенные тексты, переопределяемые файлами из SYSTEM_PROMPT_DIR
+SYSTEM_PROMPT_DIR = os.getenv("SYSTEM_PROMPT_DIR")
+SYSTEM_PROMPT_LOCALE = os.getenv("SYSTEM_PROMPT_LOCALE", DEFAULT_LOCALE)
 
 # Инициализация компонентов
-message_processor = MessageProcessor()
-telegram_adapter = TelegramAdapter(message_processor)
-web_adapter = WebAdapter(message_processor)
-cli_adapter = CLIAdapter(message_processor)
+state_backend = create_state_backend(STATE_BACKEND_URL) if STATE_BACKEND_URL else None
+history_store = HistoryStore(
+    HISTORY_DB_PATH,
+    flush_interval=HISTORY_FLUSH_INTERVAL,
+    compact_interval=HISTORY_COMPACT_INTERVAL,
+    retention_per_user=HISTORY_RETENTION_PER_USER,
+    max_pending=HISTORY_MAX_PENDING
+) if HISTORY_DB_PATH else None
+response_cache = ExactMatchResponseCache(
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=RESPONSE_CACHE_MAX_BYTES,
+    ttl=RESPONSE_CACHE_TTL
+) if RESPONSE_CACHE_ENABLED else None
+metrics = Metrics(shared_dir=METRICS_DIR, stale_after=METRICS_STALE_AFTER)
+mcp_servers = load_mcp_servers(MCP_SERVERS_FILE) if MCP_SERVERS_FILE else []
+mcp_client = MCPClient(mcp_servers, health_check_interval=MCP_HEALTH_CHECK_INTERVAL) if mcp_servers else None
+tool_catalog = ToolCatalog(
+    mcp_client,
+    tariffs=load_tariffs(TOOL_TARIFFS_FILE) if TOOL_TARIFFS_FILE else None,
+    ttl=TOOL_CATALOG_TTL
+) if mcp_client else None
+tool_result_cache = ToolResultCache(
+    tool_cache_ttls(mcp_servers),
+    max_entries=TOOL_RESULT_CACHE_MAX_ENTRIES,
+    max_bytes=TOOL_RESULT_CACHE_MAX_BYTES
+) if TOOL_RESULT_CACHE_ENABLED else None
+tool_executor = ToolExecutor(
+    mcp_client,
+    call_timeout=TOOL_CALL_TIMEOUT,
+    result_cache=tool_result_cache
+) if mcp_client else None
+message_processor = MessageProcessor(
+    response_cache=response_cache,
+    metrics=metrics,
+    sessions=SessionStore(idle_ttl=SESSION_IDLE_TTL, max_size=SESSION_MAX_SIZE),
+    state_backend=state_backend,
+    mcp_client=mcp_client,
+    tool_catalog=tool_catalog,
+    tool_executor=tool_executor,
+    system_prompts=SystemPromptBuilder(SYSTEM_PROMPT_DIR, default_locale=SYSTEM_PROMPT_LOCALE)
+)
+
+# Реестр адаптеров: встроенные + сторонние из entry points
+adapter_registry = AdapterRegistry()
+adapter_registry.register(TelegramAdapter(message_processor))
+adapter_registry.register(WebAdapter(message_processor, history_store))
+adapter_registry.register(CLIAdapter(message_processor, history_store))
+adapter_registry.load_entry_points(message_processor)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Асинхронное управление жизненным циклом"""
     logger.info("Запуск Multi-Protocol Gateway...")
-    await asyncio.gather(
-        telegram_adapter.initialize(),
-        web_adapter.initialize(),
-        cli_adapter.initialize()
-    )
+    if state_backend:
+        await state_backend.start()
+    if history_store:
+        await history_store.start()
+    if mcp_client:
+        await mcp_client.start()
+        await tool_catalog.start()
+    await adapter_registry.initialize_all()
+    
+    # Горячая перезагрузка API ключей: по SIGHUP и при изменении файла
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, api_key_store.reload)
+    except (AttributeError, NotImplementedError):
+        logger.info("SIGHUP недоступен, перезагрузка ключей только по изменению файла")
+    
+    keys_watcher = None
+    if API_KEYS_FILE:
+        keys_watcher = asyncio.create_task(api_key_store.watch_file(API_KEYS_RELOAD_INTERVAL))
+    
+    metrics_flusher = None
+    if METRICS_DIR:
+        metrics_flusher = asyncio.create_task(metrics.run_flusher(METRICS_FLUSH_INTERVAL))
+    
     logger.info("Gateway успешно запущен")
     
     yield
     
     logger.info("Остановка Gateway...")
-    await asyncio.gather(
-        telegram_adapter.shutdown(),
-        web_adapter.shutdown(),
-        cli_adapter.shutdown()
-    )
+    # Фоновые задачи отменяются и дожидаются, чтобы их finally выполнился до закрытия цикла
+    background = [task for task in (keys_watcher, metrics_flusher) if task]
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await adapter_registry.shutdown_all()
+    if mcp_client:
+        await tool_catalog.stop()
+        await mcp_client.stop()
+    if history_store:
+        await history_store.stop()
+    if state_backend:
+        await state_backend.stop()
 
 # CORS configuration
 origins = os.getenv("CORS_ORIGINS", "*").split(",")
@@ -101,7 +280,8 @@ origins = os.getenv("CORS_ORIGINS", "*").split(",")
 app = FastAPI(
     title="Multi-Protocol Gateway", 
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 app.add_middleware(
@@ -114,24 +294,193 @@ app.add_middleware(
 
 # === UNIFIED MESSAGE ENDPOINT ===
 
-@app.post("/message", dependencies=[Depends(api_key_auth)])
-async def unified_message_handler(message: UnifiedMessage):
+async def dispatch_message(message: UnifiedMessage):
+    """Передача сообщения адаптеру по типу клиента (KeyError для неизвестного типа)"""
+    processor = adapter_registry.handlers[message.client_type]
+    
+    started = time.perf_counter()
+    try:
+        return await processor(message)
+    finally:
+        metrics.record_stage("dispatch", message.client_type, message.message_type, time.perf_counter() - started)
+
+def inline_schema_refs(schema: Any, defs: Dict[str, Any]) -> Any:
+    """Подстановка вложенных определений ($defs) на место ссылок на них"""
+    if isinstance(schema, list):
+        return [inline_schema_refs(item, defs) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    ref = schema.get("$ref", "")
+    if ref.startswith("#/$defs/"):
+        rest = {name: value for name, value in schema.items() if name != "$ref"}
+        return inline_schema_refs({**defs[ref[len("#/$defs/"):]], **rest}, defs)
+    return {name: inline_schema_refs(value, defs) for name, value in schema.items()}
+
+def message_json_schema() -> Dict[str, Any]:
+    """JSON Schema сообщения для OpenAPI: ссылки $defs не разрешаются относительно документа OpenAPI"""
+    schema = UnifiedMessage.model_json_schema()
+    return inline_schema_refs(schema, schema.pop("$defs", {}))
+
+# Тело запроса разбирается вручную (JSON или MessagePack), поэтому схема объявляется явно
+MESSAGE_SCHEMA = message_json_schema()
+MESSAGE_REQUEST_BODY = {
+    "requestBody": {
+        "content": {
+            "application/json": {"schema": MESSAGE_SCHEMA},
+            **({MSGPACK_CONTENT_TYPE: {"schema": MESSAGE_SCHEMA}} if MSGPACK_AVAILABLE else {})
+        },
+        "required": True
+    }
+}
+BATCH_REQUEST_BODY = {
+    "requestBody": {
+        "content": {
+            "application/json": {"schema": {"type": "array", "items": MESSAGE_SCHEMA, "maxItems": BATCH_MAX_SIZE}},
+            # NDJSON: одно сообщение в строке
+            "application/x-ndjson": {"schema": MESSAGE_SCHEMA}
+        },
+        "required": True
+    }
+}
+
+async def parse_message(request: Request) -> UnifiedMessage:
+    """Разбор и валидация сообщения из тела запроса: JSON или MessagePack (по Content-Type)"""
+    body = await request.body()
+    try:
+        if not is_msgpack(request.headers.get("content-type")):
+            return UnifiedMessage.model_validate_json(body)
+        
+        if not MSGPACK_AVAILABLE:
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="MessagePack is not supported")
+        try:
+            data = unpackb(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid MessagePack payload")
+        return UnifiedMessage.model_validate(data)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+@app.post("/message", openapi_extra=MESSAGE_REQUEST_BODY)
+async def unified_message_handler(request: Request, key_info: APIKeyInfo = Depends(api_key_auth)):
     """Единый эндпоинт для всех типов сообщений"""
+    # Валидация выполняется вручную, чтобы измерить ее длительность
+    started = time.perf_counter()
+    message = await parse_message(request)
+    metrics.record_stage("validation", message.client_type, message.message_type, time.perf_counter() - started)
+    metrics.record_stage("auth", message.client_type, message.message_type, request.state.auth_duration)
+    
+    if not is_client_allowed(key_info, message):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="API Key is not allowed for this client type")
+    
+    enforce_rate_limit(key_info, message)
+    
     try:
-        processor = {
-            ClientType.TELEGRAM: telegram_adapter.handle_unified_message,
-            ClientType.WEB: web_adapter.handle_message,
-            ClientType.CLI: cli_adapter.handle_command
-        }[message.client_type]
+        response = await dispatch_message(message)
         
-        response = await processor(message)
-        return {"status": "ok", "response": response.content}
+        started = time.perf_counter()
+        content = {"status": "ok", "response": response.content}
+        if MSGPACK_AVAILABLE and is_msgpack(request.headers.get("accept")):
+            result = MsgPackResponse(content)
+        else:
+            result = FastJSONResponse(content)
+        metrics.record_stage("serialization", message.client_type, message.message_type, time.perf_counter() - started)
+        return result
     except KeyError:
         raise HTTPException(status_code=400, detail="Unsupported client type")
     except Exception as e:
         logger.exception(f"Ошибка обработки сообщения: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/message/stream", openapi_extra=MESSAGE_REQUEST_BODY)
+async def stream_message_handler(request: Request, key_info: APIKeyInfo = Depends(api_key_auth)):
+    """Потоковый ответ на сообщение в формате Server-Sent Events"""
+    message = await parse_message(request)
+    
+    if not is_client_allowed(key_info, message):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="API Key is not allowed for this client type")
+    
+    enforce_rate_limit(key_info, message)
+    
+    try:
+        streamer = adapter_registry.streamers[message.client_type]
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Streaming is not supported for client type")
+    
+    async def event_stream():
+        try:
+            async for chunk in streamer(message):
+                yield b"data: " + dumps({"content": chunk}) + b"\n\n"
+        except Exception as e:
+            logger.exception(f"Ошибка потоковой обработки сообщения: {e}")
+            yield b"event: error\ndata: " + dumps({"detail": "Internal server error"}) + b"\n\n"
+            return
+        yield b"event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/messages/batch", openapi_extra=BATCH_REQUEST_BODY)
+async def batch_message_handler(request: Request, key_info: APIKeyInfo = Depends(api_key_auth)):
+    """Пакетная обработка сообщений: JSON-массив или NDJSON (application/x-ndjson)"""
+    body = await request.body()
+    
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            items = [loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid batch payload")
+    
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Batch must be a list of messages")
+    
+    if len(items) > BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch size exceeds limit of {BATCH_MAX_SIZE}"
+        )
+    
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def process_item(index: int, item: Any) -> Dict[str, Any]:
+        """Обработка одного элемента пакета с результатом или ошибкой"""
+        started = time.perf_counter()
+        try:
+            message = UnifiedMessage.model_validate(item)
+        except ValidationError as e:
+            return {"index": index, "status": "error", "error": str(e)}
+        metrics.record_stage("validation", message.client_type, message.message_type, time.perf_counter() - started)
+        
+        if not is_client_allowed(key_info, message):
+            return {"index": index, "id": message.id, "status": "error", "error": "API Key is not allowed for this client type"}
+        
+        if retry_after := check_rate_limit(key_info, message):
+            return {
+                "index": index,
+                "id": message.id,
+                "status": "error",
+                "error": "Rate limit exceeded",
+                "retry_after": math.ceil(retry_after)
+            }
+        
+        async with semaphore:
+            try:
+                response = await dispatch_message(message)
+            except KeyError:
+                return {"index": index, "id": message.id, "status": "error", "error": "Unsupported client type"}
+            except Exception as e:
+                logger.exception(f"Ошибка обработки сообщения из пакета: {e}")
+                return {"index": index, "id": message.id, "status": "error", "error": "Internal server error"}
+        
+        return {"index": index, "id": message.id, "status": "ok", "response": response.content}
+    
+    results = await asyncio.gather(*(process_item(i, item) for i, item in enumerate(items)))
+    return {"status": "ok", "results": results}
+
 # === HEALTH AND STATUS ENDPOINTS ===
 
 @app.get("/health")
@@ -140,17 +489,30 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "adapters": {
-            "telegram": await telegram_adapter.health_check(),
-            "web": await web_adapter.health_check(),
-            "cli": await cli_adapter.health_check(),
-        }
+        "worker": {
+            "pid": os.getpid(),
+            # Количество воркеров, недавно сбрасывавших метрики в общий каталог
+            "workers_alive": metrics.snapshot()["workers"]
+        },
+        "adapters": await adapter_registry.health_checks(),
+        "mcp_servers": mcp_client.get_stats() if mcp_client else None
     }
 
 @app.get("/stats")
 async def get_stats():
     """Статистика Gateway"""
-    return await message_processor.get_stats()
+    return {
+        **await message_processor.get_stats(),
+        "rate_limits": {
+            "api_keys": key_rate_limiter.get_stats(),
+            "users": user_rate_limiter.get_stats()
+        }
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Метрики в текстовом формате Prometheus"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 async def root():
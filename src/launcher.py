@@ -0,0 +1,186 @@
+import logging
+import asyncio
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+# Загрузка переменных из .env
+load_dotenv()
+
+# Настройка логирования
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Настройки запуска.
+# Ограничители частоты запросов и кеши (ответов, результатов инструментов, команд)
+# хранятся в памяти каждого воркера: фактические лимиты и объем кешей умножаются на GATEWAY_WORKERS
+GATEWAY_HOST = os.getenv("GATEWAY_HOST", "0.0.0.0")
+GATEWAY_PORT = int(os.getenv("GATEWAY_PORT", "8000"))
+GATEWAY_WORKERS = int(os.getenv("GATEWAY_WORKERS", str(os.cpu_count() or 1)))
+WORKER_READY_TIMEOUT = float(os.getenv("WORKER_READY_TIMEOUT", "30"))
+WORKER_STOP_TIMEOUT = float(os.getenv("WORKER_STOP_TIMEOUT", "30"))
+
+# Перезапуск упавшего воркера: задержка растет, если воркер падает сразу после старта
+RESTART_BACKOFF_MIN = 0.5
+RESTART_BACKOFF_MAX = 30.0
+MIN_HEALTHY_UPTIME = 5.0
+
+def create_reuseport_socket(host: str, port: int) -> socket.socket:
+    """Слушающий сокет с SO_REUSEPORT: ядро распределяет соединения между воркерами"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(host: str, port: int, ready):
+    """Точка входа воркера: собственный сокет на общем порту и uvicorn"""
+    import uvicorn
+    
+    sock = create_reuseport_socket(host, port)
+    server = uvicorn.Server(uvicorn.Config("gateway:app", host=host, port=port))
+    
+    async def serve():
+        serving = asyncio.create_task(server.serve(sockets=[sock]))
+        while not server.started and not serving.done():
+            await asyncio.sleep(0.05)
+        if server.started:
+            ready.set()
+        await serving
+    
+    asyncio.run(serve())
+
+class Supervisor:
+    """Супервизор воркеров Gateway с перезапуском и поочередной заменой"""
+    
+    def __init__(self, host: str, port: int, workers: int):
+        self.host = host
+        self.port = port
+        self.workers_count = workers
+        self.context = multiprocessing.get_context("spawn")
+        # pid -> (процесс, время запуска)
+        self.workers: Dict[int, tuple] = {}
+        self.backoff = RESTART_BACKOFF_MIN
+        self.stopping = False
+        self.restart_requested = False
+    
+    def start_worker(self) -> tuple:
+        """Запуск воркера и ожидание готовности; возвращает (процесс, готов ли воркер)"""
+        ready = self.context.Event()
+        process = self.context.Process(target=run_worker, args=(self.host, self.port, ready), daemon=False)
+        process.start()
+        self.workers[process.pid] = (process, time.monotonic())
+        
+        if not ready.wait(WORKER_READY_TIMEOUT):
+            logger.error(f"Воркер {process.pid} не запустился за {WORKER_READY_TIMEOUT} с")
+            return process, False
+        logger.info(f"Воркер {process.pid} готов")
+        return process, True
+    
+    def stop_worker(self, process: multiprocessing.Process):
+        """Мягкая остановка воркера (uvicorn дожидается текущих запросов)"""
+        self.workers.pop(process.pid, None)
+        process.terminate()
+        process.join(WORKER_STOP_TIMEOUT)
+        if process.is_alive():
+            logger.warning(f"Воркер {process.pid} не остановился, принудительное завершение")
+            process.kill()
+            process.join()
+    
+    def rolling_restart(self):
+        """Поочередная замена воркеров: новый запускается до остановки старого"""
+        logger.info("Поочередный перезапуск воркеров")
+        for process, _ in list(self.workers.values()):
+            if self.stopping:
+                return
+            new_process, ready = self.start_worker()
+            if not ready:
+                # Старый воркер продолжает работать, перезапуск прерывается
+                self.stop_worker(new_process)
+                logger.error("Поочередный перезапуск прерван: новый воркер не готов")
+                return
+            self.stop_worker(process)
+        logger.info("Поочередный перезапуск завершен")
+    
+    def reap_workers(self):
+        """Перезапуск завершившихся воркеров с нарастающей задержкой при частых падениях"""
+        for pid, (process, started) in list(self.workers.items()):
+            if process.is_alive():
+                continue
+            del self.workers[pid]
+            uptime = time.monotonic() - started
+            logger.error(f"Воркер {pid} завершился с кодом {process.exitcode} через {uptime:.1f} с")
+            
+            if uptime < MIN_HEALTHY_UPTIME:
+                time.sleep(self.backoff)
+                self.backoff = min(self.backoff * 2, RESTART_BACKOFF_MAX)
+            else:
+                self.backoff = RESTART_BACKOFF_MIN
+            
+            if not self.stopping:
+                self.start_worker()
+    
+    def run(self):
+        """Основной цикл супервизора"""
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_restart)
+        
+        logger.info(f"Запуск {self.workers_count} воркеров Gateway на {self.host}:{self.port}")
+        for _ in range(self.workers_count):
+            self.start_worker()
+        
+        while not self.stopping:
+            if self.restart_requested:
+                self.restart_requested = False
+                self.rolling_restart()
+            self.reap_workers()
+            time.sleep(0.5)
+        
+        logger.info("Остановка воркеров Gateway...")
+        for process, _ in list(self.workers.values()):
+            self.stop_worker(process)
+    
+    def _handle_stop(self, signum, frame):
+        self.stopping = True
+    
+    def _handle_restart(self, signum, frame):
+        self.restart_requested = True
+
+def bootstrap_shared_state() -> Optional[str]:
+    """Настройка общего состояния воркеров; возвращает созданный временный каталог метрик"""
+    created = None
+    # Каталог для агрегации метрик между воркерами (/stats, /metrics)
+    if not os.getenv("METRICS_DIR"):
+        created = os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="gateway-metrics-")
+        logger.info(f"Каталог метрик воркеров: {created}")
+    
+    backend = os.getenv("STATE_BACKEND_URL", "")
+    if not backend or backend.startswith("memory://"):
+        logger.warning("STATE_BACKEND_URL не задан или memory:// - сессии не будут общими для воркеров")
+    return created
+
+def main():
+    if GATEWAY_WORKERS <= 1 or not hasattr(socket, "SO_REUSEPORT"):
+        # Однопроцессный режим (в том числе на платформах без SO_REUSEPORT)
+        import uvicorn
+        uvicorn.run("gateway:app", host=GATEWAY_HOST, port=GATEWAY_PORT)
+        return
+    
+    metrics_dir = bootstrap_shared_state()
+    try:
+        Supervisor(GATEWAY_HOST, GATEWAY_PORT, GATEWAY_WORKERS).run()
+    finally:
+        if metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse, Response
+
+from core.serialization import MSGPACK_CONTENT_TYPE, dumps, packb
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ с сериализацией через orjson (с откатом на стандартный json)"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class MsgPackResponse(Response):
+    """Ответ в формате MessagePack"""
+    
+    media_type = MSGPACK_CONTENT_TYPE
+    
+    def render(self, content: Any) -> bytes:
+        return packb(content)
@@ -22,4 +22,24 @@ WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
 TELEGRAM_API_KEY = os.getenv("TELEGRAM_API_KEY")
 
 # Получение Gateway URL
-GATEWAY_URL = os.getenv("GATEWAY_URL")
\ No newline at end of file
+GATEWAY_URL = os.getenv("GATEWAY_URL")
+
+# Настройки HTTP-клиента для Gateway
+GATEWAY_TIMEOUT = float(os.getenv("GATEWAY_TIMEOUT", "10.0"))
+GATEWAY_HTTP2 = os.getenv("GATEWAY_HTTP2", "false").lower() in ("1", "true", "yes")
+GATEWAY_MAX_CONNECTIONS = int(os.getenv("GATEWAY_MAX_CONNECTIONS", "100"))
+GATEWAY_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GATEWAY_MAX_KEEPALIVE_CONNECTIONS", "20"))
+GATEWAY_KEEPALIVE_EXPIRY = float(os.getenv("GATEWAY_KEEPALIVE_EXPIRY", "30.0"))
+
+# Формат обмена с Gateway: MessagePack (если установлен пакет msgpack), иначе JSON
+GATEWAY_MSGPACK = os.getenv("GATEWAY_MSGPACK", "true").lower() in ("1", "true", "yes")
+
+# Настройки очереди обработки обновлений
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "8"))
+UPDATE_QUEUE_SIZE = int(os.getenv("UPDATE_QUEUE_SIZE", "1000"))
+UPDATE_DRAIN_TIMEOUT = float(os.getenv("UPDATE_DRAIN_TIMEOUT", "10.0"))
+UPDATE_RETRY_AFTER = int(os.getenv("UPDATE_RETRY_AFTER", "1"))
+
+# Настройки потоковых ответов
+GATEWAY_STREAMING = os.getenv("GATEWAY_STREAMING", "true").lower() in ("1", "true", "yes")
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
@@ -1,16 +1,29 @@
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException, status
-from telegram import Update
+from fastapi.responses import JSONResponse
+from telegram import Message, Update
+from telegram.error import BadRequest
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 import httpx
 import os
 import asyncio
 import uuid
 from datetime import datetime
+from typing import AsyncIterator
 
 # Импорт модулей
-from config import BOT_TOKEN, WEBHOOK_SECRET, WEBHOOK_DOMAIN, TELEGRAM_API_KEY, GATEWAY_URL
+from config import (
+    BOT_TOKEN, WEBHOOK_SECRET, WEBHOOK_DOMAIN, TELEGRAM_API_KEY, GATEWAY_URL,
+    GATEWAY_TIMEOUT, GATEWAY_HTTP2, GATEWAY_MAX_CONNECTIONS,
+    GATEWAY_MAX_KEEPALIVE_CONNECTIONS, GATEWAY_KEEPALIVE_EXPIRY,
+    UPDATE_WORKERS, UPDATE_QUEUE_SIZE, UPDATE_DRAIN_TIMEOUT, UPDATE_RETRY_AFTER,
+    GATEWAY_STREAMING, STREAM_EDIT_INTERVAL, GATEWAY_MSGPACK
+)
+from update_dispatcher import UpdateDispatcher
+from wire import (
+    JSON_CONTENT_TYPE, MSGPACK_CONTENT_TYPE, MSGPACK_AVAILABLE, dumps, loads, packb, unpackb
+)
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -18,21 +31,89 @@ logger = logging.getLogger(__name__)
 # Инициализация Telegram Application
 application = Application.builder().token(BOT_TOKEN).build()
 
+# Ограниченная очередь обновлений с пулом обработчиков
+update_dispatcher = UpdateDispatcher(
+    handler=application.process_update,
+    workers=UPDATE_WORKERS,
+    max_queue_size=UPDATE_QUEUE_SIZE
+)
+
+def update_key(update: Update):
+    """Ключ упорядочивания: чат обновления, либо само обновление, если чата нет"""
+    if update.effective_chat:
+        return ("chat", update.effective_chat.id)
+    return ("update", update.update_id)
+
+# Максимальная длина текста сообщения Telegram
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Общий HTTP-клиент для Gateway (создается и закрывается в lifespan)
+gateway_client: httpx.AsyncClient | None = None
+
+# Обмен с Gateway в MessagePack; если Gateway его не принимает (415), используется JSON
+gateway_msgpack = GATEWAY_MSGPACK and MSGPACK_AVAILABLE
+
+def create_gateway_client() -> httpx.AsyncClient:
+    """Создает долгоживущий HTTP-клиент с пулом keep-alive соединений к Gateway"""
+    http2 = GATEWAY_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("Пакет h2 не установлен, HTTP/2 отключен (pip install httpx[http2])")
+            http2 = False
+    
+    if GATEWAY_MSGPACK and not MSGPACK_AVAILABLE:
+        logger.warning("Пакет msgpack не установлен, обмен с Gateway в JSON (pip install msgpack)")
+    
+    return httpx.AsyncClient(
+        base_url=GATEWAY_URL,
+        timeout=GATEWAY_TIMEOUT,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=GATEWAY_MAX_CONNECTIONS,
+            max_keepalive_connections=GATEWAY_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=GATEWAY_KEEPALIVE_EXPIRY
+        ),
+        headers={"X-API-Key": TELEGRAM_API_KEY}
+    )
+
+async def post_to_gateway(payload: dict) -> dict:
+    """Отправляет сообщение на /message в MessagePack с откатом на JSON"""
+    global gateway_msgpack
+    
+    if gateway_msgpack:
+        response = await gateway_client.post(
+            "/message",
+            content=packb(payload),
+            headers={"Content-Type": MSGPACK_CONTENT_TYPE, "Accept": MSGPACK_CONTENT_TYPE}
+        )
+        if response.status_code != status.HTTP_415_UNSUPPORTED_MEDIA_TYPE:
+            response.raise_for_status()
+            if MSGPACK_CONTENT_TYPE in response.headers.get("content-type", ""):
+                return unpackb(response.content)
+            return loads(response.content)
+        logger.warning("Gateway не принимает MessagePack, обмен переключен на JSON")
+        gateway_msgpack = False
+    
+    response = await gateway_client.post(
+        "/message",
+        content=dumps(payload),
+        headers={"Content-Type": JSON_CONTENT_TYPE}
+    )
+    response.raise_for_status()
+    return loads(response.content)
+
 async def send_to_gateway(payload: dict) -> tuple[bool, str]:
     """Отправляет данные в Gateway и возвращает статус успеха и сообщение"""
+    if gateway_client is None:
+        logger.error("HTTP-клиент Gateway не инициализирован")
+        return False, "HTTP-клиент Gateway не инициализирован"
+    
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                f"{GATEWAY_URL}/message", # Измененный эндпоинт
-                json=payload,
-                headers={
-                    "Content-Type": "application/json",
-                    "X-API-Key": TELEGRAM_API_KEY # Добавлен API ключ
-                }
-            )
-            response.raise_for_status()
-            logger.info(f"Сообщение успешно отправлено в Gateway")
-            return True, response.json().get("response", "Успешно отправлено в Gateway")
+        data = await post_to_gateway(payload)
+        logger.info(f"Сообщение успешно отправлено в Gateway")
+        return True, data.get("response", "Успешно отправлено в Gateway")
     except httpx.RequestError as e:
         logger.error(f"Ошибка при отправке в Gateway: {e}")
         return False, f"Не удалось подключиться к Gateway: {e}"
@@ -43,6 +124,95 @@ async def send_to_gateway(payload: dict) -> tuple[bool, str]:
         logger.error(f"Неизвестная ошибка: {e}")
         return False, f"Неизвестная ошибка: {e}"
 
+class GatewayStreamError(Exception):
+    """Ошибка, переданная Gateway в потоке событий"""
+
+async def stream_from_gateway(payload: dict) -> AsyncIterator[str]:
+    """Получает ответ Gateway частями через Server-Sent Events"""
+    if gateway_client is None:
+        raise GatewayStreamError("HTTP-клиент Gateway не инициализирован")
+    
+    async with gateway_client.stream(
+        "POST",
+        "/message/stream",
+        content=dumps(payload),
+        headers={"Content-Type": JSON_CONTENT_TYPE}
+    ) as response:
+        response.raise_for_status()
+        event = "message"
+        async for line in response.aiter_lines():
+            if not line:
+                event = "message"
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data = loads(line[5:])
+                if event == "error":
+                    raise GatewayStreamError(data.get("detail", "Неизвестная ошибка"))
+                if event == "done":
+                    return
+                yield data["content"]
+
+async def edit_reply(reply: Message, text: str):
+    """Редактирование сообщения; повторная отправка того же текста ошибкой не считается"""
+    try:
+        await reply.edit_text(text)
+    except BadRequest as e:
+        if "message is not modified" not in str(e).lower():
+            raise
+
+async def stream_reply(update: Update, payload: dict):
+    """Отвечает пользователю, постепенно дополняя сообщение частями ответа Gateway"""
+    reply = await update.message.reply_text("Сообщение принято! Обрабатываю...")
+    loop = asyncio.get_running_loop()
+    text = ""
+    # Длинный ответ продолжается в новых сообщениях: start - начало части текущего сообщения,
+    # head - префикс (только у первого), shown - уже показанная часть
+    start = 0
+    head = "Ответ Gateway: "
+    shown = ""
+    last_edit = loop.time()
+    
+    async def show():
+        nonlocal reply, start, head, shown
+        while True:
+            part = text[start:start + TELEGRAM_MESSAGE_LIMIT - len(head)]
+            if part != shown and part.strip():
+                await edit_reply(reply, head + part)
+                shown = part
+            if start + len(part) >= len(text):
+                return
+            # Сообщение заполнено, продолжение - в новом сообщении
+            start += len(part)
+            head = ""
+            shown = ""
+            reply = await update.message.reply_text("...")
+    
+    try:
+        async for chunk in stream_from_gateway(payload):
+            text += chunk
+            # Ограничение частоты редактирования (лимиты Telegram Bot API)
+            if loop.time() - last_edit >= STREAM_EDIT_INTERVAL and text.strip():
+                await show()
+                last_edit = loop.time()
+    except httpx.RequestError as e:
+        logger.error(f"Ошибка при отправке в Gateway: {e}")
+        await edit_reply(reply, f"Произошла ошибка при обработке запроса: Не удалось подключиться к Gateway: {e}")
+        return
+    except httpx.HTTPStatusError as e:
+        logger.error(f"HTTP error from Gateway: {e.response.status_code}")
+        await edit_reply(reply, f"Произошла ошибка при обработке запроса: Ошибка от Gateway: {e.response.status_code}")
+        return
+    except Exception as e:
+        logger.error(f"Ошибка потокового ответа Gateway: {e}")
+        await edit_reply(reply, f"Произошла ошибка при обработке запроса: {e}"[:TELEGRAM_MESSAGE_LIMIT])
+        return
+    
+    if not text.strip():
+        await edit_reply(reply, "Gateway вернул пустой ответ")
+        return
+    await show()
+
 async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /start"""
     user = update.effective_user
@@ -89,6 +259,10 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         }
     }
     
+    if GATEWAY_STREAMING:
+        await stream_reply(update, payload)
+        return
+    
     await update.message.reply_text(f"Сообщение принято! Обрабатываю...")
 
     success, message = await send_to_gateway(payload)
@@ -104,9 +278,15 @@ application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, message_
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Управление жизненным циклом приложения"""
+    global gateway_client
+    
+    # Пул соединений к Gateway
+    gateway_client = create_gateway_client()
+    
     # Инициализация бота
     await application.initialize()
     await application.start()
+    await update_dispatcher.start()
     
     # Установка вебхука
     await application.bot.set_webhook(
@@ -119,9 +299,14 @@ async def lifespan(app: FastAPI):
     
     # Очистка при завершении
     await application.bot.delete_webhook()
+    await update_dispatcher.stop(timeout=UPDATE_DRAIN_TIMEOUT)
     await application.stop()
     await application.shutdown()
     logger.info("Вебхук удален, бот остановлен")
+    
+    await gateway_client.aclose()
+    gateway_client = None
+    logger.info("HTTP-клиент Gateway закрыт")
 
 app = FastAPI(lifespan=lifespan, title="Telegram Bot Gateway", version="1.0.0")
 
@@ -133,11 +318,17 @@ async def telegram_webhook(request: Request):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
     
     try:
-        update_data = await request.json()
+        update_data = loads(await request.body())
         update = Update.de_json(update_data, application.bot)
         
-        # Асинхронная обработка без ожидания
-        asyncio.create_task(application.process_update(update))
+        # Постановка в очередь чата; при переполнении Telegram повторит доставку позже
+        if not update_dispatcher.submit(update_key(update), update):
+            logger.warning("Очередь обновлений переполнена, обновление отклонено")
+            return JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"status": "busy"},
+                headers={"Retry-After": str(UPDATE_RETRY_AFTER)}
+            )
         
         return {"status": "ok"}
     except Exception as e:
@@ -152,7 +343,8 @@ async def root():
 async def health_check():
     return {
         "status": "healthy",
-        "bot": application.bot.first_name if application.bot else "not initialized"
+        "bot": application.bot.first_name if application.bot else "not initialized",
+        "updates": update_dispatcher.get_stats()
     }
 
 if __name__ == '__main__':
@@ -0,0 +1,100 @@
+import logging
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List
+
+logger = logging.getLogger(__name__)
+
+class UpdateDispatcher:
+    """Ограниченная очередь обновлений: по порядку внутри чата, параллельно между чатами"""
+    
+    def __init__(self, handler: Callable[[Any], Awaitable[None]], workers: int, max_queue_size: int):
+        self.handler = handler
+        self.workers_count = workers
+        self.max_queue_size = max_queue_size
+        # Очереди ожидающих обновлений по ключам; ключ удаляется, когда его очередь пуста и не обрабатывается
+        self.pending: Dict[Hashable, Deque[Any]] = {}
+        # Ключи, готовые к обработке (каждый ключ находится здесь не более одного раза)
+        self.ready: asyncio.Queue = asyncio.Queue()
+        self.queued = 0
+        self.workers: List[asyncio.Task] = []
+        self.stats = {
+            "accepted": 0,
+            "processed": 0,
+            "dropped": 0,
+            "errors": 0,
+            "busy_workers": 0,
+            "max_queue_depth": 0
+        }
+    
+    async def start(self):
+        """Запуск пула обработчиков"""
+        self.workers = [
+            asyncio.create_task(self._worker(), name=f"update-worker-{i}")
+            for i in range(self.workers_count)
+        ]
+        logger.info(f"Запущено обработчиков обновлений: {self.workers_count}")
+    
+    async def stop(self, timeout: float):
+        """Остановка с дренированием оставшихся в очереди обновлений"""
+        try:
+            await asyncio.wait_for(self.ready.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Не обработано обновлений при остановке: {self.queued}")
+        
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers.clear()
+        logger.info("Обработчики обновлений остановлены")
+    
+    def submit(self, key: Hashable, update: Any) -> bool:
+        """Постановка обновления в очередь ключа, False если очередь заполнена"""
+        if self.queued >= self.max_queue_size:
+            self.stats["dropped"] += 1
+            return False
+        
+        updates = self.pending.get(key)
+        if updates is None:
+            # Ключ простаивал - создаем очередь и отдаем ключ обработчикам
+            updates = self.pending[key] = deque()
+            self.ready.put_nowait(key)
+        updates.append(update)
+        
+        self.queued += 1
+        self.stats["accepted"] += 1
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self.queued)
+        return True
+    
+    async def _worker(self):
+        """Цикл обработчика: берет готовый ключ и обрабатывает одно его обновление"""
+        while True:
+            key = await self.ready.get()
+            updates = self.pending[key]
+            update = updates.popleft()
+            self.queued -= 1
+            self.stats["busy_workers"] += 1
+            try:
+                await self.handler(update)
+                self.stats["processed"] += 1
+            except Exception as e:
+                logger.exception(f"Ошибка обработки обновления: {e}")
+                self.stats["errors"] += 1
+            finally:
+                self.stats["busy_workers"] -= 1
+                # Ключ возвращается в конец очереди, чтобы другие чаты не ждали
+                if updates:
+                    self.ready.put_nowait(key)
+                else:
+                    del self.pending[key]
+                self.ready.task_done()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Метрики очереди и обработчиков"""
+        return {
+            **self.stats,
+            "queue_depth": self.queued,
+            "queue_capacity": self.max_queue_size,
+            "active_chats": len(self.pending),
+            "workers": len(self.workers)
+        }
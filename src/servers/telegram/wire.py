@@ -0,0 +1,37 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Типы содержимого запросов к Gateway
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+MSGPACK_AVAILABLE = msgpack is not None
+
+def dumps(obj: Any) -> bytes:
+    """Сериализация в JSON (UTF-8): orjson, если установлен, иначе стандартный json"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def loads(data: bytes | str) -> Any:
+    """Разбор JSON из байтов или строки"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def packb(obj: Any) -> bytes:
+    """Сериализация в MessagePack"""
+    return msgpack.packb(obj, use_bin_type=True)
+
+def unpackb(data: bytes) -> Any:
+    """Разбор MessagePack"""
+    return msgpack.unpackb(data, raw=False)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули Gateway импортируются от каталога src, как при запуске gateway.py
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
@@ -0,0 +1,78 @@
+"""Минимальный stdio MCP-сервер для тестов клиента"""
+import asyncio
+import json
+import sys
+
+async def main():
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    cancelled = []
+    # id запроса серверу -> future ответа клиента
+    client_replies = {}
+    next_id = 0
+    
+    def send(message):
+        sys.stdout.write(json.dumps(message) + "\n")
+        sys.stdout.flush()
+    
+    def result(request_id, value):
+        send({"jsonrpc": "2.0", "id": request_id, "result": value})
+    
+    def text(request_id, value):
+        result(request_id, {"content": [{"type": "text", "text": json.dumps(value)}]})
+    
+    async def call_tool(request_id, name, arguments):
+        nonlocal next_id
+        if name == "sleep":
+            await asyncio.sleep(arguments.get("seconds", 0.2))
+            text(request_id, arguments)
+        elif name == "fail":
+            send({"jsonrpc": "2.0", "id": request_id, "error": {"code": -32602, "message": "Invalid arguments"}})
+        elif name == "cancelled":
+            text(request_id, cancelled)
+        elif name == "ask_client":
+            # Запрос серверу клиенту: клиент должен ответить на ping
+            next_id += 1
+            future = client_replies[f"s{next_id}"] = loop.create_future()
+            send({"jsonrpc": "2.0", "id": f"s{next_id}", "method": arguments.get("method", "ping")})
+            text(request_id, await future)
+        else:
+            text(request_id, arguments)
+    
+    async def handle(message):
+        method = message.get("method")
+        request_id = message.get("id")
+        params = message.get("params") or {}
+        if method is None:
+            client_replies.pop(request_id).set_result(message)
+        elif method == "initialize":
+            result(request_id, {
+                "protocolVersion": "2025-03-26",
+                "capabilities": {"tools": {"listChanged": True}},
+                "serverInfo": {"name": "fake"}
+            })
+        elif method == "ping":
+            result(request_id, {})
+        elif method == "notifications/cancelled":
+            cancelled.append(params["requestId"])
+        elif method == "tools/list":
+            # Две страницы; после второй - уведомление об изменении списка
+            if not params.get("cursor"):
+                result(request_id, {"tools": [{"name": "sleep", "inputSchema": {"type": "object"}}], "nextCursor": "2"})
+            else:
+                result(request_id, {"tools": [{"name": "echo", "inputSchema": {"type": "object"}}]})
+                send({"jsonrpc": "2.0", "method": "notifications/tools/list_changed"})
+        elif method == "tools/call":
+            await call_tool(request_id, params["name"], params.get("arguments") or {})
+        elif request_id is not None:
+            send({"jsonrpc": "2.0", "id": request_id, "error": {"code": -32601, "message": "Method not found"}})
+    
+    tasks = set()
+    while line := await reader.readline():
+        task = asyncio.create_task(handle(json.loads(line)))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+if __name__ == "__main__":
+    asyncio.run(main())
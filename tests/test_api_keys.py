@@ -0,0 +1,52 @@
+import json
+
+from core.api_keys import APIKeyStore
+from core.models import ClientType
+
+def test_env_keys_bound_to_client_types(monkeypatch):
+    monkeypatch.setenv("TELEGRAM_API_KEY", "telegram-secret")
+    monkeypatch.setenv("WEB_API_KEY", "web-secret")
+    monkeypatch.delenv("CLI_API_KEY", raising=False)
+    store = APIKeyStore()
+    store.load()
+    assert store.lookup("telegram-secret").client_type == ClientType.TELEGRAM
+    assert store.lookup("web-secret").client_type == ClientType.WEB
+    assert store.lookup("unknown") is None
+
+def test_shared_key_value_allows_all_bound_client_types(monkeypatch):
+    monkeypatch.setenv("TELEGRAM_API_KEY", "shared-secret")
+    monkeypatch.setenv("WEB_API_KEY", "shared-secret")
+    monkeypatch.delenv("CLI_API_KEY", raising=False)
+    store = APIKeyStore()
+    store.load()
+    key_info = store.lookup("shared-secret")
+    assert key_info.client_type == ClientType.TELEGRAM
+    assert key_info.shared_client_types == [ClientType.WEB]
+    assert len(store) == 1
+
+def test_shared_key_value_with_unbound_entry_allows_any_client(monkeypatch, tmp_path):
+    monkeypatch.delenv("TELEGRAM_API_KEY", raising=False)
+    monkeypatch.delenv("WEB_API_KEY", raising=False)
+    monkeypatch.setenv("CLI_API_KEY", "cli-secret")
+    keys_file = tmp_path / "keys.json"
+    keys_file.write_text(json.dumps([{"key": "cli-secret", "name": "partner", "quota_per_minute": 60}]))
+    store = APIKeyStore(str(keys_file))
+    store.load()
+    key_info = store.lookup("cli-secret")
+    assert key_info.client_type is None
+    assert key_info.quota_per_minute == 60
+    assert key_info.name == "cli_api_key,partner"
+
+def test_invalid_file_keeps_previous_set_on_reload(monkeypatch, tmp_path):
+    monkeypatch.delenv("TELEGRAM_API_KEY", raising=False)
+    monkeypatch.delenv("WEB_API_KEY", raising=False)
+    monkeypatch.setenv("CLI_API_KEY", "cli-secret")
+    keys_file = tmp_path / "keys.json"
+    keys_file.write_text(json.dumps([{"key": "partner-secret", "name": "partner"}]))
+    store = APIKeyStore(str(keys_file))
+    store.load()
+    
+    keys_file.write_text("[{")
+    assert not store.reload()
+    assert store.lookup("partner-secret").name == "partner"
+    assert store.lookup("cli-secret").client_type == ClientType.CLI
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from adapters.cli_adapter import CLIAdapter
+from core.message_processor import MessageProcessor
+from core.models import ClientType, MessageType, UnifiedMessage
+
+def make_message(content: str, **metadata) -> UnifiedMessage:
+    return UnifiedMessage(
+        id="1",
+        client_type=ClientType.CLI,
+        message_type=MessageType.COMMAND,
+        content=content,
+        user_id="user",
+        timestamp=datetime.now(),
+        metadata=metadata
+    )
+
+def test_parse_command_quoted_arguments():
+    adapter = CLIAdapter(MessageProcessor())
+    assert adapter._parse_command(make_message('send "hello world"')) == ("send", ["hello world"])
+
+def test_parse_command_unbalanced_quote_falls_back_to_whitespace():
+    adapter = CLIAdapter(MessageProcessor())
+    assert adapter._parse_command(make_message("send what's up")) == ("send", ["what's", "up"])
+
+def test_parse_command_from_metadata():
+    adapter = CLIAdapter(MessageProcessor())
+    message = make_message("ignored", command="history", args=["5"])
+    assert adapter._parse_command(message) == ("history", ["5"])
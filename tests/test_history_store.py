@@ -0,0 +1,50 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from core.history_store import HistoryStore
+
+def test_flush_writes_buffer_visible_to_queries(tmp_path):
+    async def test():
+        store = HistoryStore(str(tmp_path / "history.db"), flush_interval=3600)
+        await store.start()
+        try:
+            for i in range(3):
+                store.append("cli_history", "user", {"command": f"cmd{i}"})
+            await store.flush()
+            rows = await store.query_user("cli_history", "user", 10)
+            assert [payload["command"] for payload, _ in rows] == ["cmd0", "cmd1", "cmd2"]
+            assert store.get_stats()["pending"] == 0
+        finally:
+            await store.stop()
+    
+    asyncio.run(test())
+
+def test_failed_flush_requeues_up_to_max_pending(tmp_path):
+    async def test():
+        store = HistoryStore(str(tmp_path / "history.db"), flush_interval=3600, max_pending=3)
+        await store.start()
+        
+        def fail(batch):
+            raise sqlite3.OperationalError("database is locked")
+        
+        write_batch, store._write_batch = store._write_batch, fail
+        try:
+            for i in range(5):
+                store.append("cli_history", "user", {"command": f"cmd{i}"})
+            with pytest.raises(sqlite3.OperationalError):
+                await store.flush()
+            # Отбрасываются самые старые записи
+            assert [row[3] for row in store.pending] == ['{"command": "cmd2"}', '{"command": "cmd3"}', '{"command": "cmd4"}']
+            assert store.get_stats()["dropped"] == 2
+            
+            store._write_batch = write_batch
+            await store.flush()
+            rows = await store.query_user("cli_history", "user", 10)
+            assert [payload["command"] for payload, _ in rows] == ["cmd2", "cmd3", "cmd4"]
+        finally:
+            store._write_batch = write_batch
+            await store.stop()
+    
+    asyncio.run(test())
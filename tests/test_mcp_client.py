@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+import pytest
+
+from core.mcp_client import MCPClient, MCPConnectionError, MCPError, MCPSession
+from core.models import MCPServerConfig
+
+FAKE_SERVER = os.path.join(os.path.dirname(__file__), "fake_mcp_server.py")
+
+def fake_config(**kwargs) -> MCPServerConfig:
+    return MCPServerConfig(name="fake", command=sys.executable, args=[FAKE_SERVER], **kwargs)
+
+def tool_text(result) -> object:
+    return json.loads(result["content"][0]["text"])
+
+async def with_client(test, **kwargs):
+    client = MCPClient([fake_config(**kwargs)], health_check_interval=3600)
+    await client.start()
+    try:
+        await test(client)
+    finally:
+        await client.stop()
+
+def test_session_base_is_abstract():
+    with pytest.raises(TypeError):
+        MCPSession(fake_config())
+
+def test_list_tools_follows_pagination_and_notifies():
+    async def test(client):
+        notifications = []
+        client.add_notification_handler(lambda server, method, params: notifications.append((server, method)))
+        tools = await client.list_tools("fake")
+        assert [tool["name"] for tool in tools] == ["sleep", "echo"]
+        await asyncio.sleep(0.1)
+        assert notifications == [("fake", "notifications/tools/list_changed")]
+    
+    asyncio.run(with_client(test))
+
+def test_parallel_calls_share_one_session():
+    async def test(client):
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            client.call_tool("fake", "sleep", {"seconds": 0.3, "i": i}) for i in range(10)
+        ))
+        assert time.perf_counter() - started < 2.0
+        assert [tool_text(result)["i"] for result in results] == list(range(10))
+        assert client.get_stats()["fake"]["sessions_opened"] == 1
+    
+    asyncio.run(with_client(test, pool_size=1))
+
+def test_error_reply_raises_mcp_error():
+    async def test(client):
+        with pytest.raises(MCPError) as error:
+            await client.call_tool("fake", "fail", {})
+        assert error.value.code == -32602
+        assert tool_text(await client.call_tool("fake", "echo", {"x": 1})) == {"x": 1}
+    
+    asyncio.run(with_client(test))
+
+def test_timeout_sends_cancellation_and_releases_task():
+    async def test(client):
+        with pytest.raises(asyncio.TimeoutError):
+            await client.call_tool("fake", "sleep", {"seconds": 1}, timeout=0.1)
+        session = client.pools["fake"].sessions[0]
+        await asyncio.sleep(0.1)
+        assert not session.background_tasks
+        assert tool_text(await client.call_tool("fake", "cancelled", {})) == [session.next_id - 1]
+    
+    asyncio.run(with_client(test, pool_size=1))
+
+def test_server_request_is_answered():
+    async def test(client):
+        ping = tool_text(await client.call_tool("fake", "ask_client", {"method": "ping"}))
+        assert ping["result"] == {}
+        unknown = tool_text(await client.call_tool("fake", "ask_client", {"method": "sampling/createMessage"}))
+        assert unknown["error"]["code"] == -32601
+        assert not client.pools["fake"].sessions[0].background_tasks
+    
+    asyncio.run(with_client(test, pool_size=1))
+
+def test_dead_session_is_replaced():
+    async def test(client):
+        pool = client.pools["fake"]
+        pool.sessions[0].process.kill()
+        await asyncio.sleep(0.2)
+        assert tool_text(await client.call_tool("fake", "echo", {"x": 2})) == {"x": 2}
+        assert pool.get_stats()["sessions_opened"] == 2
+    
+    asyncio.run(with_client(test, pool_size=1))
+
+def test_unavailable_server_raises_connection_error():
+    async def test():
+        client = MCPClient([MCPServerConfig(name="missing", command="/nonexistent/mcp-server")])
+        await client.start()
+        try:
+            with pytest.raises(MCPConnectionError):
+                await client.call_tool("missing", "echo", {})
+        finally:
+            await client.stop()
+    
+    asyncio.run(test())
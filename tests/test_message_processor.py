@@ -0,0 +1,87 @@
+import asyncio
+from datetime import datetime
+
+from core.message_processor import MessageProcessor
+from core.response_cache import ExactMatchResponseCache
+from core.models import ClientType, MessageType, UnifiedMessage
+from core.state_backend import MemoryStateBackend
+
+class BrokenStateBackend(MemoryStateBackend):
+    """Хранилище, недоступное для записи и чтения сессий"""
+    
+    async def touch_member(self, key: str, member: str, ttl: float):
+        raise ConnectionError("backend is down")
+    
+    async def count_members(self, key: str) -> int:
+        raise ConnectionError("backend is down")
+
+def make_message(content: str = "привет", client_type: ClientType = ClientType.WEB, **metadata) -> UnifiedMessage:
+    return UnifiedMessage(
+        id="1",
+        client_type=client_type,
+        message_type=MessageType.TEXT,
+        content=content,
+        user_id="42",
+        timestamp=datetime.now(),
+        metadata=metadata
+    )
+
+def test_unavailable_state_backend_does_not_fail_requests():
+    async def test():
+        processor = MessageProcessor(state_backend=BrokenStateBackend())
+        response = await processor.process_message(make_message())
+        assert "Получено сообщение: привет" in response.content
+        chunks = [chunk async for chunk in processor.stream_message(make_message())]
+        assert "Произошла ошибка" not in "".join(chunks)
+        await asyncio.sleep(0.01)
+        assert not processor.session_writes
+        assert (await processor.get_stats())["active_sessions"] == 1
+    
+    asyncio.run(test())
+
+def test_sessions_are_shared_through_state_backend():
+    async def test():
+        backend = MemoryStateBackend()
+        processor = MessageProcessor(state_backend=backend)
+        await processor.process_message(make_message())
+        await processor.process_message(make_message(session_id="second"))
+        await asyncio.sleep(0.01)
+        assert (await processor.get_stats())["active_sessions"] == 2
+    
+    asyncio.run(test())
+
+def test_cached_responses_depend_on_system_prompt():
+    async def test():
+        cache = ExactMatchResponseCache(max_entries=10, max_bytes=1 << 16, ttl=None)
+        processor = MessageProcessor(response_cache=cache)
+        await processor.process_message(make_message())
+        # Промпт другого типа клиента отличается (раздел format), ответ веб-клиента ему не подходит
+        await processor.process_message(make_message(client_type=ClientType.CLI))
+        await processor.process_message(make_message())
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+    
+    asyncio.run(test())
+
+def test_cached_reply_does_not_echo_other_spelling():
+    async def test():
+        cache = ExactMatchResponseCache(max_entries=10, max_bytes=1 << 16, ttl=None)
+        processor = MessageProcessor(response_cache=cache)
+        await processor.process_message(make_message("Привет,  мир"))
+        response = await processor.process_message(make_message("привет, мир"))
+        assert cache.get_stats()["hits"] == 1
+        assert "Получено сообщение: привет, мир" in response.content
+        assert "Привет" not in response.content
+    
+    asyncio.run(test())
+
+def test_streamed_message_is_timed_as_stage():
+    async def test():
+        processor = MessageProcessor()
+        await processor.process_message(make_message())
+        chunks = [chunk async for chunk in processor.stream_message(make_message())]
+        assert chunks
+        histogram = processor.metrics.stages[("process_message", "web", "text")]
+        assert histogram.count == 2
+    
+    asyncio.run(test())
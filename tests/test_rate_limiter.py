@@ -0,0 +1,23 @@
+from core.rate_limiter import TokenBucketLimiter
+
+def test_acquire_until_empty():
+    limiter = TokenBucketLimiter(rate=1.0, capacity=2, max_keys=10)
+    assert limiter.acquire("key") == 0
+    assert limiter.acquire("key") == 0
+    assert limiter.acquire("key") > 0
+    assert limiter.get_stats()["allowed"] == 2
+    assert limiter.get_stats()["limited"] == 1
+
+def test_check_does_not_consume():
+    limiter = TokenBucketLimiter(rate=0.001, capacity=1, max_keys=10)
+    assert limiter.check("key") == 0
+    assert limiter.check("key") == 0
+    limiter.consume("key")
+    assert limiter.check("key") > 0
+
+def test_idle_keys_are_evicted():
+    limiter = TokenBucketLimiter(rate=1.0, capacity=1, max_keys=2)
+    for key in ("a", "b", "c"):
+        limiter.acquire(key)
+    assert list(limiter.buckets) == ["b", "c"]
+    assert limiter.get_stats()["evicted"] == 1
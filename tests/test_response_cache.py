@@ -0,0 +1,20 @@
+import asyncio
+
+import pytest
+
+from core.response_cache import ExactMatchResponseCache, ResponseCache
+
+def test_response_cache_base_is_abstract():
+    with pytest.raises(TypeError):
+        ResponseCache()
+
+def test_key_is_normalized_prompt():
+    async def test():
+        cache = ExactMatchResponseCache(max_entries=10, max_bytes=1024, ttl=None)
+        await cache.set("Hello World", "tools", "prompt", "Hi")
+        assert await cache.get("  hello\n WORLD ", "tools", "prompt") == "Hi"
+        assert await cache.get("Hello World!", "tools", "prompt") is None
+        assert await cache.get("Hello World", "other-tools", "prompt") is None
+        assert await cache.get("Hello World", "tools", "other-prompt") is None
+    
+    asyncio.run(test())
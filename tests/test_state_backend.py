@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+
+from core.state_backend import RedisProtocolError, RedisStateBackend
+
+class FakeRedis:
+    """Минимальный RESP-сервер: GET/SET/INCRBY, ZADD/ZREMRANGEBYSCORE/ZCARD и ключи с особым поведением"""
+    
+    def __init__(self):
+        self.values = {}
+        self.sorted_sets = {}
+        self.server = None
+        self.connections = 0
+    
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+    
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+    
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                command = await self.read_command(reader)
+                if command is None:
+                    break
+                reply = await self.dispatch(command)
+                if reply is None:
+                    break
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def read_command(self, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2].decode())
+        return args
+    
+    async def dispatch(self, command):
+        name, *args = command
+        if name == "GET":
+            key = args[0]
+            if key == "bad":
+                return b"-WRONGTYPE Operation against a key holding the wrong kind of value\r\n"
+            if key == "drop":
+                return None
+            if key == "slow":
+                await asyncio.sleep(0.5)
+            value = self.values.get(key)
+            if value is None:
+                return b"$-1\r\n"
+            return f"${len(value)}\r\n{value}\r\n".encode()
+        if name == "SET":
+            self.values[args[0]] = args[1]
+            return b"+OK\r\n"
+        if name == "INCRBY":
+            value = int(self.values.get(args[0], 0)) + int(args[1])
+            self.values[args[0]] = str(value)
+            return f":{value}\r\n".encode()
+        if name == "ZADD":
+            members = self.sorted_sets.setdefault(args[0], {})
+            added = int(args[2] not in members)
+            members[args[2]] = float(args[1])
+            return f":{added}\r\n".encode()
+        if name == "ZREMRANGEBYSCORE":
+            members = self.sorted_sets.get(args[0], {})
+            low, high = float(args[1]), float(args[2])
+            expired = [member for member, score in members.items() if low <= score <= high]
+            for member in expired:
+                del members[member]
+            return f":{len(expired)}\r\n".encode()
+        if name == "ZCARD":
+            return f":{len(self.sorted_sets.get(args[0], {}))}\r\n".encode()
+        return f"-ERR unknown command '{name}'\r\n".encode()
+
+async def with_backend(test):
+    fake = FakeRedis()
+    port = await fake.start()
+    backend = RedisStateBackend("127.0.0.1", port, pool_size=1, acquire_timeout=1.0)
+    await backend.start()
+    try:
+        await test(fake, backend)
+    finally:
+        await backend.stop()
+        await fake.stop()
+
+async def wait_for_pool(backend: RedisStateBackend):
+    for _ in range(100):
+        if backend.pool.qsize() == backend.pool_size:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("Соединение не вернулось в пул")
+
+def test_error_reply_returns_connection_and_reads_all_replies():
+    async def test(fake, backend):
+        with pytest.raises(RedisProtocolError, match="WRONGTYPE"):
+            await backend.execute(("GET", "bad"), ("INCRBY", "counter", 1))
+        assert backend.pool.qsize() == 1
+        # Ответ на INCRBY из пакета с ошибкой прочитан и не достанется следующей команде
+        assert await backend.execute(("INCRBY", "counter", 1)) == [2]
+        assert fake.connections == 1
+    
+    asyncio.run(with_backend(test))
+
+def test_dropped_socket_is_replaced():
+    async def test(fake, backend):
+        with pytest.raises(ConnectionError):
+            await backend.execute(("GET", "drop"))
+        await wait_for_pool(backend)
+        assert len(backend.connections) == 1
+        await backend.execute(("SET", "key", "value"))
+        assert await backend.execute(("GET", "key")) == [b"value"]
+        assert fake.connections == 2
+    
+    asyncio.run(with_backend(test))
+
+def test_cancelled_command_does_not_leak_connection():
+    async def test(fake, backend):
+        await backend.execute(("SET", "slow", "late"), ("SET", "key", "value"))
+        task = asyncio.create_task(backend.execute(("GET", "slow")))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await wait_for_pool(backend)
+        # Запоздалый ответ на отмененную команду не читается новым соединением
+        assert await backend.execute(("GET", "key")) == [b"value"]
+        assert len(backend.connections) == 1
+    
+    asyncio.run(with_backend(test))
+
+def test_members_expire():
+    async def test(fake, backend):
+        await backend.touch_member("sessions", "web:1", 60)
+        await backend.touch_member("sessions", "web:1", 60)
+        await backend.touch_member("sessions", "web:2", 0.05)
+        assert await backend.count_members("sessions") == 2
+        await asyncio.sleep(0.1)
+        assert await backend.count_members("sessions") == 1
+    
+    asyncio.run(with_backend(test))
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from core.models import ClientType, MessageType, UnifiedMessage
+from core.system_prompt import SystemPromptBuilder, substitute
+from core.tool_catalog import EMPTY_TOOLSET, ToolSet
+
+TOOLSET = ToolSet(
+    version=1,
+    tools=[{"name": "search__web_search", "description": "Поиск в интернете", "input_schema": {}}],
+    payload=b"[]",
+    key="k",
+    routes={}
+)
+
+def make_message(**metadata) -> UnifiedMessage:
+    return UnifiedMessage(
+        id="1",
+        client_type=ClientType.WEB,
+        message_type=MessageType.TEXT,
+        content="привет",
+        user_id="42",
+        user_name="{date}",
+        timestamp=datetime.now(),
+        metadata=metadata
+    )
+
+def test_substitute_keeps_literal_braces():
+    template = 'Формат: {"answer": "..."} и {unknown}, тариф {tariff} {'
+    assert substitute(template, tariff="pro") == 'Формат: {"answer": "..."} и {unknown}, тариф pro {'
+
+def test_override_with_braces_compiles(tmp_path):
+    (tmp_path / "format_cli.md").write_text('Отвечай JSON-объектом {"text": "..."}', encoding="utf-8")
+    (tmp_path / "dynamic.md").write_text("Пользователь {user_name}, {0}", encoding="utf-8")
+    builder = SystemPromptBuilder(str(tmp_path))
+    prompt = builder.get("pro", ClientType.CLI, None, TOOLSET)
+    assert 'Отвечай JSON-объектом {"text": "..."}' in prompt.prefix
+    assert "Доступные функции (тариф pro):\n- search__web_search: Поиск в интернете" in prompt.prefix
+    # Значение подстановки повторно не разбирается
+    assert builder.render(prompt, make_message()).endswith("Пользователь {date}, {0}")
+
+def test_prompt_is_cached_per_tariff():
+    builder = SystemPromptBuilder()
+    first = builder.get("pro", ClientType.WEB, "ru", TOOLSET)
+    assert builder.get("pro", ClientType.WEB, "ru", TOOLSET) is first
+    assert builder.get(None, ClientType.WEB, "ru", EMPTY_TOOLSET).key != first.key
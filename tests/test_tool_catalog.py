@@ -0,0 +1,102 @@
+import asyncio
+
+from core import tool_catalog
+from core.tool_catalog import EMPTY_TOOLSET, ToolCatalog
+
+class FakeMCPClient:
+    """Клиент с заданными списками инструментов и счетчиком запросов tools/list"""
+    
+    def __init__(self, tools):
+        self.tools = tools
+        self.pools = dict.fromkeys(tools)
+        self.list_calls = []
+        self.handlers = []
+    
+    def add_notification_handler(self, handler):
+        self.handlers.append(handler)
+    
+    async def list_tools(self, server):
+        self.list_calls.append(server)
+        return [{"name": name, "inputSchema": {"type": "object"}} for name in self.tools[server]]
+    
+    def notify(self, server, method):
+        for handler in self.handlers:
+            handler(server, method, {})
+
+def test_tariffs_filter_servers_and_tools():
+    async def test():
+        client = FakeMCPClient({"search": ["web", "news"], "files": ["read", "write"]})
+        catalog = ToolCatalog(client, tariffs={
+            "default": ["search/web"],
+            "pro": ["search", "files/read"],
+            "admin": ["*"]
+        })
+        await catalog.start()
+        try:
+            assert list(catalog.get(None).routes) == ["search__web"]
+            assert catalog.get("pro").routes == {
+                "files__read": ("files", "read"),
+                "search__web": ("search", "web"),
+                "search__news": ("search", "news")
+            }
+            assert len(catalog.get("admin").tools) == 4
+            # Ключи наборов различаются, а повторный запрос возвращает тот же объект
+            assert catalog.get("pro").key != catalog.get("admin").key
+            assert catalog.get("pro") is catalog.get("pro")
+        finally:
+            await catalog.stop()
+    
+    asyncio.run(test())
+
+def test_unknown_tariff_gets_empty_set():
+    async def test():
+        catalog = ToolCatalog(FakeMCPClient({"search": ["web"]}))
+        await catalog.start()
+        try:
+            assert catalog.get("missing") is EMPTY_TOOLSET
+            assert catalog.get(["default"]) is EMPTY_TOOLSET
+            assert catalog.get(None).routes == {"search__web": ("search", "web")}
+        finally:
+            await catalog.stop()
+    
+    asyncio.run(test())
+
+def test_list_changed_is_debounced(monkeypatch):
+    monkeypatch.setattr(tool_catalog, "LIST_CHANGED_DEBOUNCE", 0.05)
+    
+    async def test():
+        client = FakeMCPClient({"search": ["web"], "files": ["read"]})
+        catalog = ToolCatalog(client)
+        await catalog.start()
+        try:
+            version = catalog.version
+            client.list_calls.clear()
+            client.tools["search"] = ["web", "news"]
+            for _ in range(3):
+                client.notify("search", "notifications/tools/list_changed")
+            client.notify("search", "notifications/message")
+            await asyncio.sleep(0.2)
+            
+            # Три уведомления подряд дают одно обновление только изменившегося сервера
+            assert client.list_calls == ["search"]
+            assert catalog.version == version + 1
+            assert "search__news" in catalog.get(None).routes
+            assert catalog.get_stats()["list_changed"] == 3
+        finally:
+            await catalog.stop()
+    
+    asyncio.run(test())
+
+def test_unchanged_refresh_keeps_toolsets():
+    async def test():
+        catalog = ToolCatalog(FakeMCPClient({"search": ["web"]}))
+        await catalog.start()
+        try:
+            toolset = catalog.get(None)
+            await catalog.refresh()
+            assert catalog.get(None) is toolset
+            assert catalog.get_stats()["refreshes"] == 2
+        finally:
+            await catalog.stop()
+    
+    asyncio.run(test())
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+from core.mcp_client import MCPClient
+from core.models import MCPServerConfig
+from core.tool_catalog import ToolCatalog
+from core.tool_executor import ToolCall, ToolExecutor
+from core.tool_result_cache import ToolResultCache, tool_cache_ttls
+
+FAKE_SERVER = os.path.join(os.path.dirname(__file__), "fake_mcp_server.py")
+
+async def with_executor(test, pool_size=1, **kwargs):
+    config = MCPServerConfig(name="fake", command=sys.executable, args=[FAKE_SERVER], pool_size=pool_size, **kwargs)
+    client = MCPClient([config], health_check_interval=3600)
+    await client.start()
+    catalog = ToolCatalog(client)
+    await catalog.start()
+    result_cache = ToolResultCache(tool_cache_ttls([config]), 100, 1 << 20) if config.cache_ttl else None
+    try:
+        await test(client, ToolExecutor(client, call_timeout=5.0, result_cache=result_cache), catalog.get(None))
+    finally:
+        await catalog.stop()
+        await client.stop()
+
+def result_text(result) -> object:
+    return json.loads(result.content[0]["text"])
+
+def test_deadline_cancels_call_on_server():
+    async def test(client, executor, toolset):
+        (result,) = await executor.execute(
+            [ToolCall("1", "fake__sleep", {"seconds": 2})], toolset, deadline=time.monotonic() + 0.2
+        )
+        assert result.is_error
+        assert result.content[0]["text"] == "Request deadline exceeded"
+        await asyncio.sleep(0.1)
+        cancelled = json.loads((await client.call_tool("fake", "cancelled", {}))["content"][0]["text"])
+        assert len(cancelled) == 1
+        assert executor.get_stats()["deadline_exceeded"] == 1
+    
+    asyncio.run(with_executor(test))
+
+def test_calls_run_in_parallel():
+    async def test(client, executor, toolset):
+        calls = [ToolCall(str(i), "fake__sleep", {"seconds": 0.3, "i": i}) for i in range(3)]
+        started = time.monotonic()
+        results = await executor.execute(calls, toolset)
+        elapsed = time.monotonic() - started
+        # Длительность хода - самый долгий вызов, а не сумма
+        assert elapsed < 0.8
+        assert [result.call_id for result in results] == ["0", "1", "2"]
+        assert [result_text(result)["i"] for result in results] == [0, 1, 2]
+    
+    asyncio.run(with_executor(test))
+
+def test_concurrency_limit_per_server():
+    async def test(client, executor, toolset):
+        calls = [ToolCall(str(i), "fake__sleep", {"seconds": 0.2, "i": i}) for i in range(3)]
+        started = time.monotonic()
+        results = await executor.execute(calls, toolset)
+        assert time.monotonic() - started >= 0.6
+        assert not any(result.is_error for result in results)
+    
+    asyncio.run(with_executor(test, max_concurrent_calls=1))
+
+def test_deadline_cuts_only_slow_calls():
+    async def test(client, executor, toolset):
+        fast, slow = await executor.execute(
+            [ToolCall("1", "fake__echo", {"value": 1}), ToolCall("2", "fake__sleep", {"seconds": 2})],
+            toolset,
+            deadline=time.monotonic() + 0.3
+        )
+        assert not fast.is_error and result_text(fast) == {"value": 1}
+        assert slow.is_error and slow.content[0]["text"] == "Request deadline exceeded"
+    
+    asyncio.run(with_executor(test))
+
+def test_unknown_and_expired_calls_are_errors():
+    async def test(client, executor, toolset):
+        unknown, expired = await asyncio.gather(
+            executor.execute([ToolCall("1", "fake__missing", {})], toolset),
+            executor.execute([ToolCall("2", "fake__echo", {})], toolset, deadline=time.monotonic() - 1)
+        )
+        assert unknown[0].content[0]["text"] == "Unknown tool: fake__missing"
+        assert expired[0].content[0]["text"] == "Request deadline exceeded"
+        assert executor.get_stats()["errors"] == 1
+    
+    asyncio.run(with_executor(test))
+
+def test_shared_cached_call_outlives_first_deadline():
+    async def test(client, executor, toolset):
+        call = ToolCall("1", "fake__sleep", {"seconds": 0.5})
+        first = asyncio.create_task(executor.execute([call], toolset, deadline=time.monotonic() + 0.2))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(executor.execute([call], toolset))
+        (cut,), (shared,) = await asyncio.gather(first, second)
+        assert cut.content[0]["text"] == "Request deadline exceeded"
+        # Второй запрос дождался общего вызова, который не был ограничен сроком первого
+        assert not shared.is_error and result_text(shared) == {"seconds": 0.5}
+        assert executor.get_stats()["result_cache"]["coalesced"] == 1
+    
+    asyncio.run(with_executor(test, cache_ttl={"sleep": 60}))
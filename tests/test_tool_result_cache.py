@@ -0,0 +1,137 @@
+import asyncio
+
+from core.tool_result_cache import ToolResultCache
+
+def make_cache(**kwargs):
+    options = {"max_entries": 100, "max_bytes": 1 << 20, **kwargs}
+    return ToolResultCache({("search", "web"): 60.0, ("search", "slow"): 0.05}, **options)
+
+def counting_call(result, calls, delay=0.0):
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result
+    return call
+
+def test_hit_and_miss():
+    async def test():
+        cache = make_cache()
+        calls = []
+        result = {"content": [{"type": "text", "text": "ok"}]}
+        assert await cache.get_or_call("search", "web", {"q": "a", "n": 1}, counting_call(result, calls)) == result
+        # Порядок ключей аргументов не влияет на ключ записи
+        assert await cache.get_or_call("search", "web", {"n": 1, "q": "a"}, counting_call(result, calls)) == result
+        await cache.get_or_call("search", "web", {"q": "b", "n": 1}, counting_call(result, calls))
+        assert len(calls) == 2
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["misses"]) == (1, 2)
+        assert stats["hit_rate"] == 1 / 3
+    
+    asyncio.run(test())
+
+def test_uncacheable_tools_and_errors_are_not_stored():
+    async def test():
+        cache = make_cache()
+        calls = []
+        error = {"content": [{"type": "text", "text": "boom"}], "isError": True}
+        for _ in range(2):
+            await cache.get_or_call("search", "web", {}, counting_call(error, calls))
+            await cache.get_or_call("files", "write", {}, counting_call({"content": []}, calls))
+        assert len(calls) == 4
+        stats = cache.get_stats()
+        assert stats["size"] == 0
+        assert stats["uncacheable"] == 2
+    
+    asyncio.run(test())
+
+def test_expired_result_is_called_again():
+    async def test():
+        cache = make_cache()
+        calls = []
+        await cache.get_or_call("search", "slow", {}, counting_call({"content": []}, calls))
+        await asyncio.sleep(0.1)
+        await cache.get_or_call("search", "slow", {}, counting_call({"content": []}, calls))
+        assert len(calls) == 2
+    
+    asyncio.run(test())
+
+def test_concurrent_calls_are_coalesced():
+    async def test():
+        cache = make_cache()
+        calls = []
+        call = counting_call({"content": []}, calls, delay=0.1)
+        results = await asyncio.gather(*(cache.get_or_call("search", "web", {}, call) for _ in range(5)))
+        assert len(calls) == 1
+        assert results == [{"content": []}] * 5
+        assert cache.get_stats()["coalesced"] == 4
+        assert not cache.inflight
+    
+    asyncio.run(test())
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    async def test():
+        cache = make_cache()
+        calls = []
+        call = counting_call({"content": []}, calls, delay=0.2)
+        first = asyncio.create_task(cache.get_or_call("search", "web", {}, call))
+        second = asyncio.create_task(cache.get_or_call("search", "web", {}, call))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        assert await second == {"content": []}
+        assert len(calls) == 1
+        assert first.cancelled()
+    
+    asyncio.run(test())
+
+def test_failed_call_is_not_stored():
+    async def test():
+        cache = make_cache()
+        
+        async def fail():
+            raise ConnectionError("down")
+        
+        for _ in range(2):
+            try:
+                await cache.get_or_call("search", "web", {}, fail)
+            except ConnectionError:
+                pass
+        assert cache.get_stats()["size"] == 0
+        assert not cache.inflight
+    
+    asyncio.run(test())
+
+def test_entries_and_bytes_are_bounded():
+    async def test():
+        calls = []
+        cache = make_cache(max_entries=2)
+        for q in ("a", "b", "c"):
+            await cache.get_or_call("search", "web", {"q": q}, counting_call({"content": [q]}, calls))
+        stats = cache.get_stats()
+        assert (stats["size"], stats["evictions"]) == (2, 1)
+        
+        # Запись больше ограничения по байтам вытесняет сама себя
+        cache = make_cache(max_bytes=64)
+        await cache.get_or_call("search", "web", {"q": "a"}, counting_call({"content": ["x" * 100]}, calls))
+        await cache.get_or_call("search", "web", {"q": "b"}, counting_call({"content": ["y"]}, calls))
+        stats = cache.get_stats()
+        assert stats["size"] == 1
+        assert stats["weight"] <= 64
+    
+    asyncio.run(test())
+
+def test_callers_get_independent_copies():
+    async def test():
+        cache = make_cache()
+        calls = []
+        call = counting_call({"content": [{"type": "text", "text": "ok"}]}, calls, delay=0.05)
+        first, second = await asyncio.gather(*(cache.get_or_call("search", "web", {}, call) for _ in range(2)))
+        assert first == second and first is not second
+        first["content"].clear()
+        second["content"].clear()
+        assert await cache.get_or_call("search", "web", {}, call) == {"content": [{"type": "text", "text": "ok"}]}
+        hit = await cache.get_or_call("search", "web", {}, call)
+        hit["isError"] = True
+        assert "isError" not in await cache.get_or_call("search", "web", {}, call)
+        assert len(calls) == 1
+    
+    asyncio.run(test())